@@ -0,0 +1,270 @@
+'''
+Micro benchmarks of the CppCoder hot paths, they run offline on synthetic data:
+    python benchmark.py writer [members]
+    python benchmark.py memory [functions]
+    python benchmark.py frontends [headers] [classes] [methods]
+    python benchmark.py pipeline [headers] [namespaces] [classes] [methods] [depth] [legacy|modern]
+'''
+import os
+import sys
+import gc
+import time
+import shutil
+import tempfile
+import subprocess
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None # python 2: the memory figures are skipped
+
+from codewriter import *
+from xml.sax.saxutils import escape
+from xmlparser import XMLParser
+from gmockgentor import GmockCodeGentor
+from headerscanner import HeaderScanner
+
+
+def _syntheticMockLines(members):
+    return ["MOCK_CONST_METHOD2(method{0}, int (int a, const std::string & b) );".format(i) for i in range(members)]
+
+def benchWriter(members = 100000):
+    '''Lines per second of each CppCodeWriter kind when writing one class of `members` mock methods'''
+    lines = _syntheticMockLines(int(members))
+    outdir = tempfile.mkdtemp(prefix="cppcoder-bench-")
+    try:
+        for kind in ["file", "buffered"]:
+            path = os.path.join(outdir, kind + "_mock.h")
+            start = time.time()
+            writer = CppCodeWriter.new(kind, path)
+            writer.writeln("class Synthetic\n{\npublic:")
+            writer.increaseIndentLevel()
+            for line in lines:
+                writer.writeln(line)
+            writer.decreaseIndentLevel()
+            writer.writeln("};")
+            writer.close()
+            elapsed = time.time() - start
+            print("{0:>10}: {1} lines in {2:.3f}s, {3:.0f} lines/sec".format(kind, len(lines) + 5, elapsed, (len(lines) + 5) / elapsed))
+    finally:
+        shutil.rmtree(outdir)
+
+def _writeSyntheticNamespace(path, functions):
+    '''Doxygen-like compound file of one namespace spread over 100 headers'''
+    with open(path, "w") as f:
+        f.write('<?xml version="1.0"?>\n<doxygen><compounddef id="namespacesynthetic" kind="namespace">\n'
+                '<compoundname>synthetic</compoundname>\n<sectiondef kind="func">\n')
+        for i in range(functions):
+            f.write('<memberdef kind="function" id="f{0}" prot="public" static="no" const="no" explicit="no" inline="no" virt="non-virtual">'
+                    '<type>const std::string &amp;</type><definition>const std::string &amp; synthetic::function{0}</definition>'
+                    '<argsstring>(int index, const std::string &amp;name)</argsstring><name>function{0}</name>'
+                    '<param><type>int</type><declname>index</declname></param>'
+                    '<param><type>const std::string &amp;</type><declname>name</declname></param>'
+                    '<location file="/synthetic/include/header{1}.h" line="{0}"/></memberdef>\n'.format(i, i % 100))
+        f.write('</sectiondef>\n<location file="/synthetic/include/header0.h" line="1"/>\n</compounddef></doxygen>\n')
+
+def benchMemory(functions = 50000):
+    '''Bytes held per parsed Function (with its parameters and location)'''
+    functions = int(functions)
+    if tracemalloc == None:
+        print("memory: tracemalloc is not available, skipped")
+        return
+    outdir = tempfile.mkdtemp(prefix="cppcoder-bench-")
+    try:
+        path = os.path.join(outdir, "namespacesynthetic.xml")
+        _writeSyntheticNamespace(path, functions)
+        gc.collect()
+        tracemalloc.start()
+        record = XMLParser._readCompound("namespacesynthetic", path)
+        gc.collect()
+        held = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print("{0} functions: {1:.1f} MB held, {2:.0f} bytes per function".format(len(record.members), held / 1e6, float(held) / len(record.members)))
+    finally:
+        shutil.rmtree(outdir)
+
+def _writeSyntheticHeader(path, index, classes, methods):
+    with open(path, "w") as f:
+        f.write("#include <string>\n#include <map>\n\nint globalFunction{0}(int a, char *b);\n\nnamespace synthetic {{\n".format(index))
+        for c in range(classes):
+            f.write("\nclass Class{0}_{1} : public Base\n{{\npublic:\n    Class{0}_{1}();\n    virtual ~Class{0}_{1}();\n".format(index, c))
+            for m in range(methods):
+                f.write("    /** Method {0} */\n    virtual std::map<int, std::string> method{0}(int index, const std::string &name = \"\") const;\n".format(m))
+            f.write("private:\n    int mValue;\n};\n")
+        f.write("\n}\n")
+
+def _isInstalled(program):
+    '''Whether program is found in the PATH'''
+    for directory in os.environ.get("PATH", "").split(os.pathsep):
+        for name in (program, program + ".exe"):
+            if os.path.isfile(os.path.join(directory, name)) and os.access(os.path.join(directory, name), os.X_OK):
+                return True
+    return False
+
+def benchFrontends(headers = 200, classes = 5, methods = 20):
+    '''Headers per second extracted by the built-in scanner and by doxygen + XMLParser, when doxygen is installed'''
+    headers, classes, methods = int(headers), int(classes), int(methods)
+    outdir = tempfile.mkdtemp(prefix="cppcoder-bench-")
+    try:
+        files = [os.path.join(outdir, "Header{0}.h".format(i)) for i in range(headers)]
+        for i, file in enumerate(files):
+            _writeSyntheticHeader(file, i, classes, methods)
+
+        start = time.time()
+        project = HeaderScanner(files).parse()
+        elapsed = time.time() - start
+        print("{0:>10}: {1} headers, {2} classes in {3:.3f}s, {4:.0f} headers/sec".format("scan", headers, len(project.classes), elapsed, headers / elapsed))
+
+        if not _isInstalled("doxygen"):
+            print("{0:>10}: not installed, skipped".format("doxygen"))
+            return
+        with open(os.path.join(outdir, "Doxyfile"), "w") as f:
+            f.write("GENERATE_HTML=no\nGENERATE_LATEX=no\nGENERATE_XML=yes\nXML_PROGRAMLISTING=no\nQUIET=yes\nINPUT={0}\nXML_OUTPUT={0}/xml\n".format(outdir))
+        start = time.time()
+        subprocess.check_call(["doxygen", "Doxyfile"], cwd=outdir, stdout=open(os.devnull, "w"))
+        project = XMLParser(os.path.join(outdir, "xml")).parse()
+        elapsed = time.time() - start
+        print("{0:>10}: {1} headers, {2} classes in {3:.3f}s, {4:.0f} headers/sec".format("doxygen", headers, len(project.classes), elapsed, headers / elapsed))
+    finally:
+        shutil.rmtree(outdir)
+
+def _memberdef(refid, name, file, line, type, argsstring, params, virt = "non-virtual", const = False):
+    return ('<memberdef kind="function" id="{0}" prot="public" static="no" const="{1}" explicit="no" inline="no" virt="{2}">'
+            '<type>{3}</type><definition>{3} {4}</definition><argsstring>{5}</argsstring><name>{4}</name>{6}'
+            '<location file="{7}" line="{8}"/></memberdef>\n').format(
+                refid, "yes" if const else "no", virt, escape(type), name, escape(argsstring),
+                "".join("<param><type>{0}</type><declname>{1}</declname>{2}</param>".format(escape(param[0]), param[1],
+                                                                                         "<defval>{0}</defval>".format(param[2]) if len(param) > 2 else "")
+                        for param in params), file, line)
+
+def _compounddef(refid, kind, compoundname, file, body):
+    return ('<?xml version="1.0"?>\n<doxygen><compounddef id="{0}" kind="{1}" prot="public">\n<compoundname>{2}</compoundname>\n'
+            '{3}<location file="{4}" line="1"/>\n</compounddef></doxygen>\n').format(refid, kind, compoundname, body, file)
+
+def writeSyntheticCorpus(xmlDir, headers, namespaces, classes, methods, depth):
+    '''
+    Doxygen-like xml output of `headers` headers, each one declaring `classes` classes of `methods` methods
+    in each of `namespaces` namespaces shared by all headers. The classes inherit from the previous one
+    of the same namespace and header, in chains of `depth` bases at most. The method0 of a derived class
+    overrides the one of its base with a default parameter
+    '''
+    index = []
+    namespaceBodies = dict((n, []) for n in range(namespaces))
+    for h in range(headers):
+        file = "/synthetic/include/Header{0}.h".format(h)
+        headerRefid = "_header{0}_8h".format(h)
+        headerBody = ['<includes local="no">string</includes>\n<includes local="yes">Base.h</includes>\n']
+        line = 10
+        for n in range(namespaces):
+            namespaceRefid = "namespacebench_1_1ns{0}".format(n)
+            namespaceBodies[n].append(_memberdef("{0}_f{1}".format(namespaceRefid, h), "function{0}".format(h), file, line,
+                                                 "int", "(int index, const std::string &name)", [("int", "index"), ("const std::string &", "name")]))
+            previous = None
+            for c in range(classes):
+                name = "Class{0}_{1}".format(h, c)
+                refid = "classbench_1_1ns{0}_1_1_class{1}__{2}".format(n, h, c)
+                compoundname = "bench::ns{0}::{1}".format(n, name)
+                body = []
+                derived = previous != None and c % (depth + 1) != 0
+                if derived:
+                    body.append('<basecompoundref refid="{0}" prot="public" virt="non-virtual">{1}</basecompoundref>\n'.format(*previous))
+                members = [_memberdef(refid + "_ctor", name, file, line, "", "()", []),
+                           _memberdef(refid + "_dtor", "~" + name, file, line + 1, "", "()", [], "virtual")]
+                for m in range(methods):
+                    if m == 0 and derived:
+                        members.append(_memberdef("{0}_m{1}".format(refid, m), "method{0}".format(m), file, line + 2 + m,
+                                                  "std::map< int, std::string >", "(int index, double ratio=1.0) const",
+                                                  [("int", "index"), ("double", "ratio", "1.0")], "virtual", True))
+                    elif m % 2 == 0:
+                        members.append(_memberdef("{0}_m{1}".format(refid, m), "method{0}".format(m), file, line + 2 + m,
+                                                  "std::map< int, std::string >", "(int index, double ratio) const", [("int", "index"), ("double", "ratio")], "virtual", True))
+                    else:
+                        members.append(_memberdef("{0}_m{1}".format(refid, m), "method{0}".format(m), file, line + 2 + m,
+                                                  "void", "(const std::string &name)=0", [("const std::string &", "name")], "pure-virtual"))
+                body.append('<sectiondef kind="public-func">\n{0}</sectiondef>\n'.format("".join(members)))
+                with open(os.path.join(xmlDir, refid + ".xml"), "w") as f:
+                    f.write(_compounddef(refid, "class", compoundname, file, "".join(body)))
+                index.append('<compound refid="{0}" kind="class"><name>{1}</name></compound>\n'.format(refid, compoundname))
+                namespaceBodies[n].append('<innerclass refid="{0}" prot="public">{1}</innerclass>\n'.format(refid, compoundname))
+                headerBody.append('<innerclass refid="{0}" prot="public">{1}</innerclass>\n'.format(refid, compoundname))
+                previous = (refid, compoundname)
+                line += methods + 3
+            headerBody.append('<innernamespace refid="namespacebench">bench</innernamespace>\n'
+                              '<innernamespace refid="{0}">bench::ns{1}</innernamespace>\n'.format(namespaceRefid, n))
+        with open(os.path.join(xmlDir, headerRefid + ".xml"), "w") as f:
+            f.write(_compounddef(headerRefid, "file", "Header{0}.h".format(h), file, "".join(headerBody)))
+        index.append('<compound refid="{0}" kind="file"><name>Header{1}.h</name></compound>\n'.format(headerRefid, h))
+
+    for n, body in namespaceBodies.items():
+        namespaceRefid = "namespacebench_1_1ns{0}".format(n)
+        classes = "".join(item for item in body if item.startswith("<innerclass"))
+        functions = "".join(item for item in body if item.startswith("<memberdef"))
+        with open(os.path.join(xmlDir, namespaceRefid + ".xml"), "w") as f:
+            f.write(_compounddef(namespaceRefid, "namespace", "bench::ns{0}".format(n), "/synthetic/include/Header0.h",
+                                 '{0}<sectiondef kind="func">\n{1}</sectiondef>\n'.format(classes, functions)))
+        index.append('<compound refid="{0}" kind="namespace"><name>bench::ns{1}</name></compound>\n'.format(namespaceRefid, n))
+    with open(os.path.join(xmlDir, "namespacebench.xml"), "w") as f:
+        f.write(_compounddef("namespacebench", "namespace", "bench", "/synthetic/include/Header0.h", ""))
+    index.append('<compound refid="namespacebench" kind="namespace"><name>bench</name></compound>\n')
+    with open(os.path.join(xmlDir, "index.xml"), "w") as f:
+        f.write('<?xml version="1.0"?>\n<doxygenindex version="1.8.17">\n{0}</doxygenindex>\n'.format("".join(index)))
+
+def _countMembers(project):
+    return sum(len(compound.members()) for compounds in [project.headers, project.namespaces, project.classes] for compound in compounds.values())
+
+def _timeAndPeak(function):
+    '''Run function twice: timed alone, then under tracemalloc for its peak memory, None without tracemalloc'''
+    start = time.time()
+    result = function()
+    elapsed = time.time() - start
+    if tracemalloc == None:
+        return result, elapsed, None
+    gc.collect()
+    tracemalloc.start()
+    result = function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+def _formatPeak(peak):
+    return "peak {0:.1f} MB".format(peak / 1e6) if peak != None else "peak n/a"
+
+def benchPipeline(headers = 50, namespaces = 2, classes = 5, methods = 20, depth = 2, mockStyle = "legacy"):
+    '''Members per second and peak memory of XMLParser.parse and GmockCodeGentor.genCode on a synthetic corpus'''
+    headers, namespaces, classes, methods, depth = int(headers), int(namespaces), int(classes), int(methods), int(depth)
+    workDir = tempfile.mkdtemp(prefix="cppcoder-bench-")
+    try:
+        xmlDir = os.path.join(workDir, "xml")
+        outdir = os.path.join(workDir, "mock")
+        os.makedirs(xmlDir)
+        os.makedirs(outdir)
+        writeSyntheticCorpus(xmlDir, headers, namespaces, classes, methods, depth)
+
+        project, elapsed, peak = _timeAndPeak(lambda: XMLParser(xmlDir).parse())
+        members = _countMembers(project)
+        print("{0:>10}: {1} members in {2:.3f}s, {3:.0f} members/sec, {4}".format("parse", members, elapsed, members / elapsed, _formatPeak(peak)))
+
+        def genCode():
+            stdout = sys.stdout
+            with open(os.devnull, "w") as devnull:
+                sys.stdout = devnull
+                try:
+                    GmockCodeGentor(project, outdir, mockStyle = mockStyle).genCode()
+                finally:
+                    sys.stdout = stdout
+        _, elapsed, peak = _timeAndPeak(genCode)
+        print("{0:>10}: {1} members in {2:.3f}s, {3:.0f} members/sec, {4}".format("genCode", members, elapsed, members / elapsed, _formatPeak(peak)))
+    finally:
+        shutil.rmtree(workDir)
+
+_benchmarks = {
+    "writer": benchWriter,
+    "memory": benchMemory,
+    "frontends": benchFrontends,
+    "pipeline": benchPipeline,
+}
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in _benchmarks:
+        print(__doc__)
+        exit(-1)
+    _benchmarks[sys.argv[1]](*sys.argv[2:])
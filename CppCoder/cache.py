@@ -0,0 +1,72 @@
+import os
+import hashlib
+import pickle
+import subprocess
+import zlib
+
+# Sources whose changes make the cached Project slices stale
+_MODEL_SOURCES = ["data.py", "xmlparser.py", "xmlutil.py", "headerscanner.py", "cache.py"]
+
+def toolVersion():
+    '''Identify the tool: the code producing the Project model plus the version of doxygen'''
+    sha = hashlib.sha1()
+    toolDir = os.path.dirname(os.path.abspath(__file__))
+    for source in _MODEL_SOURCES:
+        with open(os.path.join(toolDir, source), "rb") as f:
+            sha.update(f.read())
+    try:
+        sha.update(subprocess.check_output(["doxygen", "--version"]))
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    return sha.hexdigest()
+
+class ProjectCache:
+    '''
+    On-disk store of the Project slices made by Project.detachHeader, one entry per input header.
+    An entry stays valid as long as the content of its header and the tool version are unchanged
+    '''
+    def __init__(self, cacheDir, version):
+        self.cacheDir = cacheDir
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        if not os.path.exists(self.cacheDir):
+            os.makedirs(self.cacheDir)
+
+    def load(self, headerPath):
+        '''Return the cached Project slice of headerPath, None when missing or stale'''
+        entryPath = self._entryPath(headerPath)
+        if os.path.isfile(entryPath):
+            try:
+                with open(entryPath, "rb") as f:
+                    digest, project = pickle.loads(zlib.decompress(f.read()))
+                if digest == self._digest(headerPath):
+                    self.hits += 1
+                    return project
+            except Exception as e:
+                print("WARNING: Ignore unreadable cache entry {0}: {1}".format(entryPath, e))
+        self.misses += 1
+        return None
+
+    def store(self, headerPath, project):
+        '''Cache the Project slice of headerPath. A slice which cannot be pickled or written is left uncached'''
+        entryPath = self._entryPath(headerPath)
+        tmpPath = entryPath + ".tmp"
+        try:
+            data = zlib.compress(pickle.dumps((self._digest(headerPath), project), pickle.HIGHEST_PROTOCOL))
+            with open(tmpPath, "wb") as f:
+                f.write(data)
+            os.rename(tmpPath, entryPath)
+        except (pickle.PicklingError, TypeError, AttributeError, RuntimeError, EnvironmentError) as e:
+            print("WARNING: Cannot cache {0}, it is extracted again next time: {1}".format(headerPath, e))
+            if os.path.exists(tmpPath):
+                os.remove(tmpPath)
+
+    def _entryPath(self, headerPath):
+        return os.path.join(self.cacheDir, hashlib.sha1(headerPath.encode("utf-8")).hexdigest() + ".cache")
+
+    def _digest(self, headerPath):
+        sha = hashlib.sha1(self.version.encode("utf-8"))
+        with open(headerPath, "rb") as f:
+            sha.update(f.read())
+        return sha.hexdigest()
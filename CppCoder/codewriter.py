@@ -1,14 +1,74 @@
+import os
+import hashlib
+import tempfile
+
+# mkstemp creates its files private, the replaced files get the mode open() would give them
+_umask = os.umask(0)
+os.umask(_umask)
+
+def writeFile(filePath, content):
+    with open(filePath, "w") as f:
+        f.write(content)
+    return True
+
+def _encode(content):
+    '''The bytes of content: text is utf-8 encoded, a python 2 str is already bytes'''
+    if isinstance(content, bytes):
+        return content
+    return content.encode("utf-8")
+
+def _replace(srcPath, dstPath):
+    if hasattr(os, "replace"):
+        os.replace(srcPath, dstPath)
+        return
+    if os.name == "nt" and os.path.exists(dstPath):
+        os.remove(dstPath) # rename does not replace an existing file on windows
+    os.rename(srcPath, dstPath)
+
+def writeFileIfChanged(filePath, content):
+    '''
+    Replace filePath with content through an atomic rename, unless the file already has the same content.
+    The bytes are compared and written as they are, so line endings never make a file look changed.
+    Return True when the file has been written
+    '''
+    data = _encode(content)
+    if os.path.isfile(filePath):
+        with open(filePath, "rb") as f:
+            if hashlib.sha1(f.read()).digest() == hashlib.sha1(data).digest():
+                return False
+    # a temporary file of its own: concurrent writers may replace the same file
+    fd, tmpPath = tempfile.mkstemp(prefix = os.path.basename(filePath) + ".", suffix = ".tmp", dir = os.path.dirname(filePath) or ".")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmpPath, 0o666 & ~_umask)
+        _replace(tmpPath, filePath)
+    except:
+        if os.path.exists(tmpPath):
+            os.remove(tmpPath)
+        raise
+    return True
+
 class CppCodeWriter:
     @staticmethod
     def new(kind, filepath):
         if kind == "file":
             return FileWriter(filepath)
+        elif kind == "buffered":
+            return BufferedFileWriter(filepath)
+        elif kind == "incremental":
+            return IncrementalFileWriter(filepath)
+        elif kind == "memory":
+            return MemoryWriter(filepath)
         else:
             return ConsoleWriter(filepath)
 
     def __init__(self): self._indentLevel = 0
     def name(self): raise Exception("{0} function name has not been implemented yet".format(self))
     def _toDevice(self, formated): raise Exception("{0} function _toDevice has not been implemented yet".format(self))
+    def close(self):
+        '''Flush what has been written, return True when the device has been modified'''
+        return True
 
     def  increaseIndentLevel(self):
         self._indentLevel += 1
@@ -52,5 +112,67 @@ class FileWriter(CppCodeWriter):
     def name(self):
         return self._writer.name
 
+    def close(self):
+        self._writer.close()
+        return True
+
     def __del__(self):
         self._writer.close()
+
+class BufferedFileWriter(CppCodeWriter):
+    '''
+    Collect the lines in memory with cached indent prefixes, the file is written at once on close(). Nothing is
+    written without it: a rendering interrupted by an exception must not replace a good file with a truncated one
+    '''
+    _indents = [""]
+
+    def __init__(self, filePath):
+        CppCodeWriter.__init__(self)
+        self._name = filePath
+        self._fragments = []
+        self._flushed = None
+
+    def name(self):
+        return self._name
+
+    def writeln(self, string = ""):
+        if self._indentLevel != 0:
+            indent = self._indent(self._indentLevel)
+            if "\n" in string:
+                string = string.replace("\n", "\n" + indent)
+            string = indent + string
+        self._fragments.append("\n" + string)
+
+    def _toDevice(self, formated):
+        self._fragments.append(formated)
+
+    @staticmethod
+    def _indent(level):
+        indents = BufferedFileWriter._indents
+        while len(indents) <= level:
+            indents.append(indents[-1] + "\t")
+        return indents[level]
+
+    def _flush(self, content):
+        return writeFile(self._name, content)
+
+    def close(self):
+        if self._flushed == None:
+            self._flushed = self._flush("".join(self._fragments))
+            self._fragments = []
+        return self._flushed
+
+class IncrementalFileWriter(BufferedFileWriter):
+    '''Keep the content in memory, the file is only replaced on close() when its content has changed'''
+    def _flush(self, content):
+        return writeFileIfChanged(self._name, content)
+
+class MemoryWriter(BufferedFileWriter):
+    '''Render in memory only, the text is available in `content` after close()'''
+    def __init__(self, filePath):
+        BufferedFileWriter.__init__(self, filePath)
+        self.content = None
+
+    def _flush(self, content):
+        self.content = content
+        return True
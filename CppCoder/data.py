@@ -1,10 +1,34 @@
+import os
+import re
 import xmlutil
 
-class CodeUnit:
-    class Location:
-        def __init__(self, file = "", line = ""):
-            self.file = file
-            self.line = line
+def lookupScopedName(names, scope, name):
+    '''
+    What name, written in the declaration of scope (a qualified name), stands for in names: { qualified name: value }.
+    The scopes enclosing scope are tried the innermost first, template arguments are left out
+    '''
+    name = re.sub(r"\s*<.*", "", name).lstrip(":")
+    scopes = scope.split("::")[:-1]
+    while True:
+        found = names.get("::".join(scopes + [name]))
+        if found != None or len(scopes) == 0:
+            return found
+        scopes.pop()
+
+# the value classes of the code units are defined at module level and aliased in the class using them:
+# python 2 pickles a class by its bare name, e.g. for the --jobs processes and the --cache entries
+class _Location(object):
+    __slots__ = ("file", "line")
+
+    def __init__(self, file = "", line = ""):
+        self.file = file
+        self.line = line
+
+class CodeUnit(object):
+    # the model is kept in memory for the whole run, slots keep each code unit compact
+    __slots__ = ("kind", "name", "location", "parent")
+
+    Location = _Location
 
     def __init__(self):
         self.kind = ""
@@ -17,18 +41,24 @@ class CodeUnit:
     def exposeTo(self, codeGentor): raise Exception("{0}: Function has not implemented yet".format(self))
 
 class Member(CodeUnit):
+    __slots__ = ("isStatic", "scope")
+
     def __init__(self):
         CodeUnit.__init__(self)
         self.isStatic = False
         self.scope = "" #public/private/protected
 
 class HasTypeMember(Member):
+    __slots__ = ("type", "argsstring", "definition")
+
     def __init__(self):
         Member.__init__(self)
         self.type = ""
         self.argsstring = ""
         self.definition = ""
 class TypeDef(HasTypeMember):
+    __slots__ = ()
+
     def __init__(self): HasTypeMember.__init__(self)
     def exposeTo(self, codeGentor):
         codeGentor.onTypeDefExposed(self)
@@ -36,12 +66,19 @@ class TypeDef(HasTypeMember):
         self.parent = parent
         parent.typedefs.append(self)
 
+class _Parameter(object):
+    __slots__ = ("type", "name", "defval", "array")
+
+    def __init__(self, type = "", name = "", defval = "", array = ""):
+        self.type = type
+        self.name = name
+        self.defval = defval
+        self.array = array # dimensions following the name: "[4]"
+
 class Function(HasTypeMember):
-    class Parameter:
-        def __init__(self, type = "", name = "", defval = ""):
-            self.type = type
-            self.name = name
-            self.defval = defval
+    __slots__ = ("explicit", "inline", "const", "virtualType", "paramsList")
+
+    Parameter = _Parameter
 
     def __init__(self):
         HasTypeMember.__init__(self)
@@ -68,6 +105,10 @@ class Function(HasTypeMember):
     def isPureVirtual(self):
         return self.virtualType == "pure-virtual"
 
+    def overrideKey(self):
+        '''What a function overriding this one has the same'''
+        return (self.name, tuple([param.type for param in self.paramsList]), self.const)
+
     def hasDefaultParam(self):
         i = -1
         while(i >= -len(self.paramsList)):
@@ -86,6 +127,8 @@ class Function(HasTypeMember):
             return self.type
 
 class Variable(HasTypeMember):
+    __slots__ = ()
+
     def __init__(self):
         HasTypeMember.__init__(self)
 
@@ -96,11 +139,17 @@ class Variable(HasTypeMember):
     def exposeTo(self, codeGentor):
         codeGentor.onVariableExposed(self)
 
+class _Value(object):
+    __slots__ = ("name", "initializer")
+
+    def __init__(self, name = "", initializer = ""):
+        self.name = name
+        self.initializer = initializer
+
 class Enum(Member):
-    class Value:
-        def __init__(self, name = "", initializer = ""):
-            self.name = name
-            self.initializer = initializer
+    __slots__ = ("values",)
+
+    Value = _Value
 
     def __init__(self):
         Member.__init__(self)
@@ -113,6 +162,8 @@ class Enum(Member):
         codeGentor.onEnumExposed(self)
 
 class CompoundType(CodeUnit):
+    __slots__ = ("refid", "compoundname", "dataAvailable", "typedefs", "enums", "variables", "functions", "innerclasses")
+
     def __init__(self, refid):
         CodeUnit.__init__(self)
         self.refid = refid
@@ -142,19 +193,25 @@ class CompoundType(CodeUnit):
     def members(self):
         return self.enums + self.typedefs + self.functions + self.variables
 
+class _InheritInfo(object):
+    '''
+    InheritInfo contains the information related to base class:
+    1. baseref: refid of base class, from that we can query the base class's information via Project object
+    2. accessibility: accessibility < public, protected, private>
+    3. isVirtual: virtual inheritance or not
+    '''
+    __slots__ = ("baseref", "basename", "accessibility", "isVirtual")
+
+    def __init__(self, baseref = "", basename = "", accessibility = "public", isVirtual = False):
+        self.baseref = baseref
+        self.basename = basename
+        self.accessibility = accessibility
+        self.isVirtual = isVirtual
+
 class Class(CompoundType):
-    class InheritInfo:
-        '''
-        InheritInfo contains the information related to base class:
-        1. baseref: refid of base class, from that we can query the base class's information via Project object
-        2. accessibility: accessibility < public, protected, private>
-        3. isVirtual: virtual inheritance or not
-        '''
-        def __init__(self, baseref = "", basename = "", accessibility = "public", isVirtual = False):
-            self.baseref = baseref
-            self.basename = basename
-            self.accessibility = accessibility
-            self.isVirtual = isVirtual
+    __slots__ = ("inheritInfo",)
+
+    InheritInfo = _InheritInfo
 
     def __init__(self, refid=""):
         CompoundType.__init__(self, refid)
@@ -169,6 +226,8 @@ class Class(CompoundType):
     def exposeTo(self, codeGentor):codeGentor.onClassExposed(self)
 
 class Namespace(CompoundType):
+    __slots__ = ()
+
     def __init__(self, refid):
         CompoundType.__init__(self, refid)
 
@@ -176,11 +235,74 @@ class Namespace(CompoundType):
         codeGentor.onNamespaceExposed(self)
 
 
+def _newCompound(cls):
+    return cls.__new__(cls)
+
+class LazyCompound(object):
+    '''
+    Mixin of the compounds whose data is loaded the first time one of their attributes is read:
+    loader(compound) fills them the way the parser fills a plain compound. Only refid, parent and the
+    location set before the loading are known beforehand
+    '''
+    __slots__ = ()
+
+    def __getattr__(self, name):
+        # only reached for the slots which are not set yet, i.e. as long as the compound is not loaded
+        if name == "_loader" or self._loader == None:
+            raise AttributeError(name)
+        self.load()
+        return getattr(self, name)
+
+    def isLoaded(self):
+        return self._loader == None
+
+    def load(self):
+        loader = self._loader
+        if loader == None:
+            return
+        self._loader = None
+        parent = getattr(self, "parent", None)
+        location = getattr(self, "location", None)
+        self._baseType.__init__(self, self.refid)
+        self.parent = parent
+        if location != None:
+            self.location = location
+        loader(self)
+
+    def __reduce_ex__(self, protocol):
+        '''Pickled and copied as the plain compound, once loaded'''
+        self.load()
+        slots = [slot for cls in type(self).__mro__ for slot in getattr(cls, "__slots__", ()) if slot != "_loader"]
+        state = dict((slot, getattr(self, slot)) for slot in slots if hasattr(self, slot))
+        return (_newCompound, (self._baseType,), (None, state))
+
+class LazyClass(LazyCompound, Class):
+    __slots__ = ("_loader",)
+    _baseType = Class
+
+    def __init__(self, refid, loader):
+        self.refid = refid
+        self._loader = loader
+
+class LazyNamespace(LazyCompound, Namespace):
+    __slots__ = ("_loader",)
+    _baseType = Namespace
+
+    def __init__(self, refid, loader):
+        self.refid = refid
+        self._loader = loader
+
+class _Include(object):
+    __slots__ = ("file", "islocal")
+
+    def __init__(self, file = "", islocal = False):
+        self.file = file
+        self.islocal = islocal
+
 class Header(CompoundType):
-    class Include:
-        def __init__(self, file = "", islocal = False):
-            self.file = file
-            self.islocal = islocal
+    __slots__ = ("namespaces", "includes", "parsed")
+
+    Include = _Include
 
     def __init__(self, refid):
         CompoundType.__init__(self, refid)
@@ -203,9 +325,15 @@ class Header(CompoundType):
     def hasClass(self, cls):
         return cls in self.innerclasses
 
-    def createIncludeSection(self):
-        includeStr = "#include <gmock/gmock.h>"
+    def createIncludeSection(self, prefixHeader = None, sharedFiles = ()):
+        '''With a prefixHeader, it replaces gmock and the sharedFiles it already includes'''
+        if prefixHeader == None:
+            includeStr = "#include <gmock/gmock.h>"
+        else:
+            includeStr = '#include "{0}"'.format(prefixHeader)
         for include in self.includes:
+            if not include.islocal and include.file in sharedFiles:
+                continue
             if include.islocal:
                 incOpen = "<"
                 incClose = ">"
@@ -216,11 +344,99 @@ class Header(CompoundType):
         return includeStr
 
 class Project:
+    _namespaceUnitKinds = ["innerclasses", "enums", "typedefs", "functions", "variables"]
+    _noNamespaceUnits = dict((kind, []) for kind in _namespaceUnitKinds)
+
     def __init__(self):
         self.headers = {}
         self.namespaces = {}
         self.classes = {}
         self.ready = False
+        self._namespaceUnitIndex = {} # namespace refid --> { location.file: { kind: [code units] } }
+        self._inheritedInterfaces = {} # class refid --> { Function.overrideKey(): Function } inherited from its bases
+        self._classesByName = None # compoundname --> Class, built the first time a base has to be looked up by name
+
+    def indexCodeUnits(self):
+        '''Group the code units of every namespace by the file they are located in, unless it is already done'''
+        for ns in self.namespaces.values():
+            self._indexNamespace(ns)
+
+    def _indexNamespace(self, ns):
+        index = self._namespaceUnitIndex.get(ns.refid)
+        if index != None:
+            return index
+        index = {}
+        for kind in Project._namespaceUnitKinds:
+            for unit in getattr(ns, kind):
+                units = index.get(unit.location.file)
+                if units == None:
+                    units = index[unit.location.file] = dict((k, []) for k in Project._namespaceUnitKinds)
+                units[kind].append(unit)
+        self._namespaceUnitIndex[ns.refid] = index
+        return index
+
+    def namespaceUnitsIn(self, ns, file):
+        '''Return the code units of ns located in file: { "innerclasses"/"enums"/"typedefs"/"functions"/"variables": [units] }'''
+        return self._indexNamespace(ns).get(file, Project._noNamespaceUnits)
+
+    def baseClasses(self, cls):
+        '''
+        The base classes of cls found in the project. A base without a known refid, e.g. declared in a header
+        extracted by another shard, scanned alone or restored from the cache, is looked up by its name
+        '''
+        if not cls.hasBase():
+            return []
+        bases = []
+        for ii in cls.inheritInfo:
+            base = self.classes.get(ii.baseref)
+            if base == None:
+                base = lookupScopedName(self._indexClassesByName(), cls.compoundname, ii.basename)
+            if base != None:
+                bases.append(base)
+        return bases
+
+    def _indexClassesByName(self):
+        if self._classesByName == None:
+            self._classesByName = dict((cls.compoundname, cls) for cls in self.classes.values())
+        return self._classesByName
+
+    def inheritedInterface(self, cls):
+        '''
+        The virtual functions cls inherits from the base classes of the project: { Function.overrideKey(): Function },
+        the closest declaration wins. The bases are resolved first and each class is resolved once, later calls are lookups
+        '''
+        interface = self._inheritedInterfaces.get(cls.refid)
+        if interface != None:
+            return interface
+        self._inheritedInterfaces[cls.refid] = {} # stands for cls while its bases are resolved: ends an inheritance cycle
+        interface = {}
+        for base in self.baseClasses(cls):
+            interface.update(self.inheritedInterface(base))
+            for func in base.functions:
+                if func.virtualType != "non-virtual" and not func.isDestructor():
+                    interface[func.overrideKey()] = func
+        self._inheritedInterfaces[cls.refid] = interface
+        return interface
+
+    def indexInheritance(self):
+        '''Resolve the inherited interface of every class, e.g. once before the generation is shared out to processes'''
+        for cls in list(self.classes.values()):
+            self.inheritedInterface(cls)
+
+    def sharedIncludes(self):
+        '''
+        The <...> includes of all the headers, each once in the order met, leaving out the headers of the project:
+        they are replaced by the generated ones, so only the others can go to a precompiled header
+        '''
+        projectFiles = set(os.path.basename(header.location.file) for header in self.headers.values())
+        seen = set()
+        includes = []
+        for header in self.headers.values():
+            for include in header.includes:
+                if not include.islocal and include.file not in seen and os.path.basename(include.file) not in projectFiles:
+                    seen.add(include.file)
+                    includes.append(include)
+        return includes
 
     def addHeader(self, refid):
         hd = self.headers.get(refid)
@@ -241,4 +457,91 @@ class Project:
         if cls == None:
             cls = Class(refid)
             self.classes[refid] = cls
-        return cls
\ No newline at end of file
+            self._classesByName = None
+        return cls
+
+    def detachHeader(self, header):
+        '''
+        Move header and the code units located in it to a new Project. The namespaces of header are
+        duplicated there with the members coming from this header only, hence the new Project has no
+        reference back to this one and can be stored or merged into another Project on its own
+        '''
+        detached = Project()
+        self._namespaceUnitIndex = {}
+        self._inheritedInterfaces = {}
+        self._classesByName = None
+        self.headers.pop(header.refid, None)
+        detached.headers[header.refid] = header
+        file = header.location.file
+
+        def inHeader(units):
+            return [unit for unit in units if unit.location.file == file]
+
+        namespaces = []
+        for ns in header.namespaces:
+            nsCopy = detached.addNamespace(ns.refid)
+            nsCopy.kind = ns.kind
+            nsCopy.name = ns.name
+            nsCopy.location = ns.location
+            nsCopy.compoundname = ns.compoundname
+            nsCopy.dataAvailable = ns.dataAvailable
+            for t in inHeader(ns.typedefs): nsCopy.adoptTypeDef(t)
+            for e in inHeader(ns.enums): nsCopy.adoptEnum(e)
+            for v in inHeader(ns.variables): nsCopy.adoptVariable(v)
+            for f in inHeader(ns.functions): nsCopy.adoptFunction(f)
+            for c in inHeader(ns.innerclasses): nsCopy.adoptClass(c)
+            namespaces.append(nsCopy)
+        header.namespaces = namespaces
+
+        def registerClasses(classes):
+            for cls in classes:
+                if cls.refid not in detached.classes:
+                    detached.classes[cls.refid] = cls
+                    registerClasses(cls.innerclasses)
+        registerClasses(header.innerclasses)
+        for ns in namespaces:
+            registerClasses(ns.innerclasses)
+
+        return detached
+
+    def removeHeader(self, header):
+        '''Drop header, the code units located in it and its classes, e.g. before merging a new extraction of it'''
+        self._namespaceUnitIndex = {}
+        self._inheritedInterfaces = {}
+        self._classesByName = None
+        self.headers.pop(header.refid, None)
+        file = header.location.file
+        for ns in header.namespaces:
+            for kind in Project._namespaceUnitKinds:
+                setattr(ns, kind, [unit for unit in getattr(ns, kind) if unit.location.file != file])
+
+        def unregisterClasses(classes):
+            for cls in classes:
+                if self.classes.get(cls.refid) is cls:
+                    del self.classes[cls.refid]
+                    unregisterClasses(cls.innerclasses)
+        unregisterClasses(header.innerclasses)
+
+    def merge(self, other):
+        '''Graft the headers of other, a Project made by detachHeader, into this Project'''
+        self._namespaceUnitIndex = {}
+        self._inheritedInterfaces = {}
+        self._classesByName = None
+        for refid, ns in other.namespaces.items():
+            target = self.namespaces.get(refid)
+            if target == None:
+                self.namespaces[refid] = ns
+                continue
+            for t in ns.typedefs: target.adoptTypeDef(t)
+            for e in ns.enums: target.adoptEnum(e)
+            for v in ns.variables: target.adoptVariable(v)
+            for f in ns.functions: target.adoptFunction(f)
+            for c in ns.innerclasses: target.adoptClass(c)
+
+        for refid, header in other.headers.items():
+            header.namespaces = [self.namespaces[ns.refid] for ns in header.namespaces]
+            self.headers[refid] = header
+
+        for refid, cls in other.classes.items():
+            if refid not in self.classes:
+                self.classes[refid] = cls
\ No newline at end of file
@@ -1,6 +1,9 @@
 import os
 import sys
 import re
+
+HEADER_PATTERN = "*.h"
+
 def warning(msg):
     sys.stderr.write("WARNING: {0}\n".format(msg))
 
@@ -10,6 +13,24 @@ def errorHelp(msg):
     python genmock.py   header1.h   header2.h   headerN.h   path/to/output/directory
     OR
     python genmock.py   *.h     path/to/output/directory
+Options:
+    --jobs N        parse doxygen output and generate the mocks with N processes
+    --shards N      split the headers in N sets extracted by concurrent doxygen processes
+    --cache         reuse the parsed data of the headers unchanged since the last run
+    --incremental   only rewrite the generated files whose content changed
+    --no-copy       let doxygen read the headers in place instead of copying them to the workspace
+    --lazy          only extract the namespaces and classes the generated mocks are made of
+    --xml-cache-size N
+                    keep the N doxygen compounds read last in memory (default 1000)
+    --profile       write a cProfile dump and a JSON report of the phase timings in outdir/.mock-profile
+    --watch         keep running and regenerate the mocks of the headers changed on disk
+    --frontend F    extract the headers with F: doxygen (default) or scan, the built-in scanner needing no doxygen
+    --mock-style S  write the mock methods with the gmock macros of style S:
+                    legacy (default) MOCK_METHODn/MOCK_CONST_METHODn or modern MOCK_METHOD
+    --aggregate     also write gmock_prefix.h, gmock and the includes shared by the headers to be precompiled,
+                    which the mocks include instead, and all_mocks.h including all the mocks
+    --mock-inherited
+                    also mock the pure virtual functions a class inherits from its bases without declaring them
     """)
     exit(-1)
 
@@ -18,18 +39,101 @@ def checkEnviron():
         errorHelp("cannot found doxygen in system, please install it!!")
 
 
+def _toPositiveCount(option, value):
+    try:
+        count = int(value)
+    except ValueError:
+        count = 0
+    if count < 1:
+        errorHelp("{0} expects a positive number, got {1}".format(option, value))
+    return count
+
+_FRONTENDS = ["doxygen", "scan"]
+
+def _toFrontend(option, value):
+    if value not in _FRONTENDS:
+        errorHelp("{0} expects one of {1}, got {2}".format(option, ", ".join(_FRONTENDS), value))
+    return value
+
+_MOCK_STYLES = ["legacy", "modern"]
+
+def _toMockStyle(option, value):
+    if value not in _MOCK_STYLES:
+        errorHelp("{0} expects one of {1}, got {2}".format(option, ", ".join(_MOCK_STYLES), value))
+    return value
+
 class ArgParser:
+    # option name --> (attribute to set, converter of the option value)
+    __valueOptions = {
+        "--jobs": ("jobs", _toPositiveCount),
+        "--shards": ("shards", _toPositiveCount),
+        "--xml-cache-size": ("xmlCacheSize", _toPositiveCount),
+        "--frontend": ("frontend", _toFrontend),
+        "--mock-style": ("mockStyle", _toMockStyle),
+    }
+    # option name --> attribute set to True when the option is given
+    __flagOptions = {
+        "--cache": "useCache",
+        "--incremental": "incremental",
+        "--no-copy": "noCopy",
+        "--lazy": "lazy",
+        "--profile": "profile",
+        "--watch": "watch",
+        "--aggregate": "aggregate",
+        "--mock-inherited": "mockInherited",
+    }
+
     def __init__(self):
         self.outdir = ""
         self.input = []
+        self.jobs = 1
+        self.shards = 1
+        self.useCache = False
+        self.incremental = False
+        self.noCopy = False
+        self.frontend = "doxygen"
+        self.mockStyle = "legacy"
+        self.lazy = False
+        self.xmlCacheSize = 1000
+        self.profile = False
+        self.watch = False
+        self.aggregate = False
+        self.mockInherited = False
 
     def parse(self):
-        if len(sys.argv) < 3:
+        args = self.__takeOptions(sys.argv[1:])
+        if len(args) < 2:
             errorHelp("Argument missing!!")
-        self.outdir = os.path.abspath(sys.argv[-1])
-        self.input = sys.argv[1:-1]
+        self.outdir = os.path.abspath(args[-1])
+        self.input = args[:-1]
         for i in range(len(self.input)):
             self.input[i] = os.path.abspath(self.input[i])
+        if self.shards > 1 and (self.mockStyle == "modern" or self.mockInherited):
+            warning("--shards: a base class extracted in another shard is only found by its name, not through a typedef "
+                    "or a using declaration: the overrides and the inherited functions of its derived classes may be missed")
+
+    def __takeOptions(self, args):
+        '''Apply the "--option value" / "--option=value" arguments, return the positional ones'''
+        positional = []
+        i = 0
+        while i < len(args):
+            name, sep, value = args[i].partition("=")
+            if name in ArgParser.__valueOptions:
+                attr, convert = ArgParser.__valueOptions[name]
+                if sep == "":
+                    i += 1
+                    if i >= len(args):
+                        errorHelp("{0} requires a value".format(name))
+                    value = args[i]
+                setattr(self, attr, convert(name, value))
+            elif args[i] in ArgParser.__flagOptions:
+                setattr(self, ArgParser.__flagOptions[args[i]], True)
+            elif args[i].startswith("--"):
+                errorHelp("Unknown option " + args[i])
+            else:
+                positional.append(args[i])
+            i += 1
+        return positional
 
     def __validateHeaderList(self):
         alterList = []
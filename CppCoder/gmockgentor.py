@@ -1,11 +1,46 @@
 import os
 import re
+import copy
+import time
+import operator
+import multiprocessing
+import multiprocessing.pool
 from codegentor import *
 from data import *
 from codewriter import *
+from codewriter import _encode
 
 gbWriteConsole = False
 
+# output templates, bound once rather than looked up for every code unit
+_renderMockMethod = "{0}{1}({2}, {3} ({4}) );".format
+_renderModernMockMethod = "MOCK_METHOD({0}, {1}, ({2}){3});".format
+_renderForwardingFunction = "{0} {1} {2} {{ {3}({4}); }}".format
+_renderDeclaration = "{0} {1} {2} {3}".format
+_renderEnumValue = "\t{0}{1},".format
+_renderTypeDef = "typedef {0} {1}{2};".format
+_renderAlias = "using {0} = {1};".format
+_renderVariable = "{0} {1};".format
+_definedByLanguage = re.compile(r"\(.*\)\s*=")
+_byLine = operator.attrgetter("location.line")
+
+def _declaredParam(param):
+    return param.type + " " + param.name + param.array
+
+def _protectCommas(text):
+    '''Parenthesize text holding a comma the preprocessor would take for a macro argument separator: std::map<K, V>'''
+    if "," not in text:
+        return text
+    depth = 0
+    for char in text:
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            return "(" + text + ")"
+    return text
+
 class CodeGenConditioner:
     '''
     This class provides base interfaces for checking that header, namespace, class, function should be mocked or not
@@ -35,9 +70,22 @@ class CodeGenConditioner:
     def doWhatWithNamespace(self, ns): return CodeGenConditioner.ACT_Ignore
     def doWhatWithFunction(self, f): return CodeGenConditioner.ACT_Ignore
 
+_renderingGentor = None
+
+def _initRenderingProcess(gentor):
+    global _renderingGentor
+    _renderingGentor = gentor
+
+def _renderHeaderInProcess(refid):
+    start = time.time()
+    renderedFiles = _renderingGentor._renderHeader(_renderingGentor.projectData.headers[refid])
+    return renderedFiles, time.time() - start
+
 class GmockCodeGentor(ICodeGentor):
     MOCK_METHOD = "MOCK_METHOD"
     MOCK_CONST_METHOD = "MOCK_CONST_METHOD"
+    PREFIX_HEADER = "gmock_prefix.h" # gmock and the includes shared by the headers, to be precompiled
+    UMBRELLA_HEADER = "all_mocks.h" # includes all the mock headers
     class _HeaderInfo:
         '''
         Provide the information of current working header
@@ -64,35 +112,112 @@ class GmockCodeGentor(ICodeGentor):
             if hasattr(self, "_globalMockClassInstance"): del self._globalMockClassInstance
             self.nonClassFunctionList = []
             self.header = None
-    def __init__(self, projectData, outdir, conditionerType = CodeGenConditioner.TYPE_Asf):
+    def __init__(self, projectData, outdir, conditionerType = CodeGenConditioner.TYPE_Asf, incremental = False, jobs = 1,
+                 mockStyle = "legacy", aggregate = False, mockInherited = False):
         assert (projectData == None or isinstance(projectData, Project))
         self.projectData = projectData
         self.outdir = outdir
+        self.incremental = incremental # only rewrite the files whose content changed
+        self.jobs = jobs
+        self.mockStyle = mockStyle # legacy: MOCK_METHODn/MOCK_CONST_METHODn, modern: MOCK_METHOD of gmock 1.10
+        self.aggregate = aggregate # also write PREFIX_HEADER and UMBRELLA_HEADER, the mocks include PREFIX_HEADER
+        self.mockInherited = mockInherited # also mock the pure virtual functions the classes inherit without declaring
+        self._sharedIncludes = []
+        self._sharedIncludeFiles = set()
+        self.writtenFiles = 0
+        self.skippedFiles = 0
+        self.bytesWritten = 0
+        self.headerTimes = {} # header compoundname --> generation wall time in seconds
         self._curHeaderInfo = None
         self._activeCodeWriter = None
+        self._renderedFiles = None # [(path, content)] of the header being rendered in memory
         self.__initializeConditioner(conditionerType)
 
     def __initializeConditioner(self, type):
         self.conditioner = CodeGenConditioner.new(type);
         self.conditioner.projectData = self.projectData
 
-    def genCode(self):
+    def genCode(self, headers = None):
+        '''Generate the mocks of headers, all the headers of the project by default'''
         if self.projectData == None or not self.projectData.ready:
             raise Exception("Project data has not been ready yet")
+        if headers == None:
+            headers = list(self.projectData.headers.values())
+        if self.aggregate:
+            self._sharedIncludes = self.projectData.sharedIncludes()
+            self._sharedIncludeFiles = set(include.file for include in self._sharedIncludes)
+
+        if self.jobs > 1 and gbWriteConsole == False:
+            self.__genCodeConcurrently(headers)
+        else:
+            for header in headers:
+                start = time.time()
+                header.exposeTo(self)
+                self.headerTimes[header.compoundname] = time.time() - start
+        if self.aggregate:
+            self.__genAggregateHeaders()
+
+        if self.incremental:
+            print("{0} file(s) written, {1} unchanged file(s) skipped".format(self.writtenFiles, self.skippedFiles))
+
+    def __genCodeConcurrently(self, headers):
+        '''Render the headers on a pool of processes, then write the rendered files on a pool of threads'''
+        refids = [header.refid for header in headers]
+        self.projectData.indexCodeUnits() # once for all processes
+        if self.mockInherited or self.mockStyle == "modern":
+            self.projectData.indexInheritance()
+        processPool = multiprocessing.Pool(self.jobs, _initRenderingProcess, (self,))
+        try:
+            renderedHeaders = processPool.map(_renderHeaderInProcess, refids)
+        finally:
+            processPool.close()
+            processPool.join()
+
+        for refid, (renderedHeader, seconds) in zip(refids, renderedHeaders):
+            self.headerTimes[self.projectData.headers[refid].compoundname] = seconds
+        renderedFiles = [renderedFile for renderedHeader, seconds in renderedHeaders for renderedFile in renderedHeader]
+        threadPool = multiprocessing.pool.ThreadPool(self.jobs)
+        try:
+            writtenList = threadPool.map(self.__writeRenderedFile, renderedFiles)
+        finally:
+            threadPool.close()
+            threadPool.join()
+        for (path, content), written in zip(renderedFiles, writtenList):
+            if written:
+                self.writtenFiles += 1
+                self.bytesWritten += len(_encode(content))
+            else:
+                self.skippedFiles += 1
+
+    def _renderHeader(self, header):
+        '''Render the files of header in memory with a task-local copy of the per-header state'''
+        task = copy.copy(self)
+        task._renderedFiles = []
+        header.exposeTo(task)
+        return task._renderedFiles
 
-        for header in self.projectData.headers.values():
-            header.exposeTo(self)
+    def __writeRenderedFile(self, renderedFile):
+        path, content = renderedFile
+        print("Start writing to " + path)
+        if self.incremental:
+            return writeFileIfChanged(path, content)
+        else:
+            return writeFile(path, content)
 
     def onTypeDefExposed(self, t):
-        self._activeCodeWriter.writeln("typedef {0} {1};".format(t.type, t.name))
+        # the argsstring ends the function pointers and the arrays: typedef void(* Callback)(int), typedef int Matrix[3][3]
+        if t.definition.startswith("using "):
+            self._activeCodeWriter.writeln(_renderAlias(t.name, t.type))
+        else:
+            self._activeCodeWriter.writeln(_renderTypeDef(t.type, t.name, t.argsstring))
 
     def onEnumExposed(self, e):
         assert (isinstance(e, Enum))
         # Write enum declaration:
-        self._activeCodeWriter.writeln("enum " + e.name + "\n{")
-        for value in e.values:
-            self._activeCodeWriter.writeln("\t" + value.name + value.initializer + ",")
-        self._activeCodeWriter.writeln("}; // " + e.name + "\n")
+        lines = ["enum " + e.name + "\n{"]
+        lines.extend([_renderEnumValue(value.name, value.initializer) for value in e.values])
+        lines.append("}; // " + e.name + "\n")
+        self._activeCodeWriter.writeln("\n".join(lines))
 
     def onFunctionExposed(self, f):
         assert (isinstance(f, Function))
@@ -103,7 +228,7 @@ class GmockCodeGentor(ICodeGentor):
 
     def onVariableExposed(self, v):
         assert (isinstance(v, Variable))
-        self._activeCodeWriter.writeln("{0} {1};".format(v.type, v.name))
+        self._activeCodeWriter.writeln(_renderVariable(v.type, v.name))
 
     def onClassExposed(self, c):
         assert (isinstance(c, Class))
@@ -117,17 +242,20 @@ class GmockCodeGentor(ICodeGentor):
         self._activeCodeWriter.increaseIndentLevel()  # Start layouting section
 
         self.__genCodeForCodeUnits(c.members(), c.innerclasses)
+        if self.mockInherited:
+            self.__4c_mockInheritedPureVirtuals(c)
 
         self._activeCodeWriter.decreaseIndentLevel()  # End layouting section
         self._activeCodeWriter.writeln("};")  # Close class
 
     def onNamespaceExposed(self, ns):
         assert (isinstance(ns, Namespace))
-        innerclasses = self.__pickCodeUnitsInCurrentHeader(ns.innerclasses)
-        enums = self.__pickCodeUnitsInCurrentHeader(ns.enums)
-        typedefs = self.__pickCodeUnitsInCurrentHeader(ns.typedefs)
-        functions = self.__pickCodeUnitsInCurrentHeader(ns.functions)
-        variables = self.__pickCodeUnitsInCurrentHeader(ns.variables)
+        units = self.projectData.namespaceUnitsIn(ns, self._curHeaderInfo.header.location.file)
+        innerclasses = units["innerclasses"]
+        enums = units["enums"]
+        typedefs = units["typedefs"]
+        functions = units["functions"]
+        variables = units["variables"]
 
         if len(innerclasses) == 0 and len(enums) == 0 and len(functions) == 0 and len(variables) == 0 :
             return
@@ -151,24 +279,62 @@ class GmockCodeGentor(ICodeGentor):
     def onHeaderExposed(self, h):
         assert (isinstance(h, Header))
         self._curHeaderInfo = GmockCodeGentor._HeaderInfo(h)
-        mockFilePath = os.path.join(self.outdir, os.path.basename(h.location.file))
-        if h.refid != "":
-            mockFilePath = mockFilePath.replace(".h", "_mock.h")
-        self._activeCodeWriter = self.__createWriter(mockFilePath)
+        self._activeCodeWriter = self.__createWriter(self.__mockFilePath(h))
         self.__4h_genMockHeader()
         self.__4h_genFakeHeader()
+        self.__closeWriter(self._activeCodeWriter)
         # self.__4h_createGloblMockHeader()
 
+    def __mockFilePath(self, h):
+        return GmockCodeGentor.generatedFiles(self.outdir, h)[0]
+
+    @staticmethod
+    def generatedFiles(outdir, h):
+        '''The files generated for h in outdir: its mock header, then the fake header standing for h'''
+        fakeFilePath = os.path.join(outdir, os.path.basename(h.location.file))
+        if h.refid == "":
+            return [fakeFilePath]
+        return [fakeFilePath.replace(".h", "_mock.h"), fakeFilePath]
+
+    def __genAggregateHeaders(self):
+        '''
+        Write PREFIX_HEADER: gmock and the includes shared by the headers, which a test build precompiles once,
+        and UMBRELLA_HEADER including all the mocks. Both are only replaced when their content changed, not to
+        invalidate the precompiled header
+        '''
+        prefixWriter = self.__createWriter(os.path.join(self.outdir, GmockCodeGentor.PREFIX_HEADER), True)
+        self.__writeIncludeGuardOpen(prefixWriter)
+        prefixWriter.writeln("#include <gmock/gmock.h>")
+        for include in self._sharedIncludes:
+            prefixWriter.writeln("#include <{0}>".format(include.file))
+        prefixWriter.writeln("\n#endif\n")
+        self.__closeWriter(prefixWriter)
+
+        umbrellaWriter = self.__createWriter(os.path.join(self.outdir, GmockCodeGentor.UMBRELLA_HEADER), True)
+        self.__writeIncludeGuardOpen(umbrellaWriter)
+        umbrellaWriter.writeln('#include "{0}"'.format(GmockCodeGentor.PREFIX_HEADER))
+        for mockFile in sorted(set(os.path.basename(self.__mockFilePath(h)) for h in self.projectData.headers.values())):
+            umbrellaWriter.writeln('#include "{0}"'.format(mockFile))
+        umbrellaWriter.writeln("\n#endif\n")
+        self.__closeWriter(umbrellaWriter)
+
+    def __writeIncludeGuardOpen(self, writer):
+        writer.writeln(
+            "#ifndef {0}\n#define {0}\n".format(
+                os.path.basename(writer.name()).replace(os.sep, "_").replace(".", "_")
+            ))
+
     def __4h_genMockHeader(self):
         assert (self._curHeaderInfo.header.dataAvailable and self._activeCodeWriter != None)
         # Write include guard
-        self._activeCodeWriter.writeln(
-            "#ifndef {0}\n#define {0}\n".format(
-                os.path.basename(self._activeCodeWriter.name()).replace(os.sep, "_").replace(".", "_")
-            ))
+        self.__writeIncludeGuardOpen(self._activeCodeWriter)
 
         # Write includes
-        if len(self._curHeaderInfo.header.includes) > 0:
+        if self.aggregate:
+            self._activeCodeWriter.writeln(self._curHeaderInfo.header.createIncludeSection(GmockCodeGentor.PREFIX_HEADER,
+                                                                                           self._sharedIncludeFiles))
+            self._activeCodeWriter.writeln("\n")
+        elif len(self._curHeaderInfo.header.includes) > 0:
             self._activeCodeWriter.writeln(self._curHeaderInfo.header.createIncludeSection())
             self._activeCodeWriter.writeln("\n")
 
@@ -183,13 +349,13 @@ class GmockCodeGentor(ICodeGentor):
 
     def __4h_genFakeHeader(self):
         if self._curHeaderInfo.header.refid != "":
-            fakeWriter = self.__createWriter(
-                os.path.join(self.outdir, os.path.basename(self._curHeaderInfo.header.location.file)))
+            fakeWriter = self.__createWriter(GmockCodeGentor.generatedFiles(self.outdir, self._curHeaderInfo.header)[1])
             if len(self._curHeaderInfo.nonClassFunctionList) > 0:
                 fakeWriter.writeln('#include "{0}"'.format(self._curHeaderInfo.getGlobalMockClassName() + ".h"))
                 fakeWriter.writeln('static {0} {1};'.format(self._curHeaderInfo.getGlobalMockClassName(),
                                                             self._curHeaderInfo.getGlobalMockClassInstance()))  # define a static global mock instance
             fakeWriter.writeln('#include "' + os.path.basename(self._activeCodeWriter.name()) + '"')
+            self.__closeWriter(fakeWriter)
 
     def __4h_createGloblMockHeader(self):
         if len(self._curHeaderInfo.nonClassFunctionList) > 0:
@@ -229,6 +395,27 @@ class GmockCodeGentor(ICodeGentor):
 
         return ": " + ", ".join(iExprList)
 
+    def __4c_mockInheritedPureVirtuals(self, c):
+        '''Mock the pure virtual functions c inherits from other headers without declaring them, the mock would be abstract'''
+        if not c.hasBase():
+            return
+        declared = set(func.overrideKey() for func in c.functions)
+        for key, func in self.projectData.inheritedInterface(c).items():
+            if not func.isPureVirtual() or key in declared:
+                continue
+            inheritedFunc = Function()
+            inheritedFunc.name = func.name
+            inheritedFunc.type = func.type
+            inheritedFunc.isStatic = False
+            inheritedFunc.const = func.const
+            inheritedFunc.virtualType = func.virtualType
+            inheritedFunc.argsstring = func.argsstring
+            inheritedFunc.paramsList = func.paramsList
+            inheritedFunc.definition = func.definition
+            inheritedFunc.location = c.location
+            inheritedFunc.parent = c # not adopted, the model of c stays as parsed
+            self.__4f_createClassMethodMock(inheritedFunc)
+
     def __4c_ExtractClassName(self, classPath):
         idx = classPath.rfind(":")
         if idx == -1:
@@ -250,34 +437,59 @@ class GmockCodeGentor(ICodeGentor):
 
 
     def __4f_createFuncThatCallsToOtherFunc(self, func, otherFuncCall):
-        return "{0} {1} {2} {{ {3}({4}); }}".format(func.type, func.name, func.argsstring, otherFuncCall,
-                                                 ", ".join([ param.name for param in func.paramsList ] ))
+        return _renderForwardingFunction(func.type, func.name, func.argsstring, otherFuncCall,
+                                         ", ".join([ param.name for param in func.paramsList ]))
 
     def __4f_createMockMethod(self, func, altName=""):
         assert (isinstance(func, Function))
+        if altName == "": altName = func.name
+        if self.mockStyle == "modern":
+            self._activeCodeWriter.writeln(self.__4f_renderModernMockMethod(func, altName))
+            return
+
         lastCloseBracket = func.argsstring.rfind(")")
         if func.argsstring[lastCloseBracket:].find("const") != -1:
             mockMethod = GmockCodeGentor.MOCK_CONST_METHOD
         else:
             mockMethod = GmockCodeGentor.MOCK_METHOD
 
-        argsstring = ", ".join([param.type + " " + param.name for param in func.paramsList])
-        if altName == "": altName = func.name
-        self._activeCodeWriter.writeln(
-            "{0}{1}({2}, {3} ({4}) );".format(mockMethod,
-                                              func.paramCount(),
-                                              altName,
-                                              func.type,
-                                              argsstring))
+        declaredParams = ", ".join([_declaredParam(param) for param in func.paramsList])
+        self._activeCodeWriter.writeln(_renderMockMethod(mockMethod, len(func.paramsList), altName, func.type, declaredParams))
+
+    def __4f_renderModernMockMethod(self, func, name):
+        '''
+        MOCK_METHOD(ret, name, (args), (specifiers)), the types holding commas are parenthesized. final is kept, it does
+        not imply override: a function overriding nothing may be final. A mock renamed from func, e.g. name_mock of a
+        function with default parameters, overrides nothing: only the forwarding function keeps the name, hence the overriding
+        '''
+        qualifiers = func.argsstring[func.argsstring.rfind(")") + 1:].split() # const noexcept override final =0
+        specifiers = []
+        if func.const:
+            specifiers.append("const")
+        if "noexcept" in qualifiers:
+            specifiers.append("noexcept")
+        if name == func.name:
+            if "override" in qualifiers or (func.virtualType != "non-virtual" and self.__4f_overridesBase(func)):
+                specifiers.append("override")
+            if "final" in qualifiers:
+                specifiers.append("final")
+        params = ", ".join([_protectCommas(_declaredParam(param)) for param in func.paramsList])
+        if len(specifiers) > 0:
+            return _renderModernMockMethod(_protectCommas(func.type), name, params, ", (" + ", ".join(specifiers) + ")")
+        return _renderModernMockMethod(_protectCommas(func.type), name, params, "")
+
+    def __4f_overridesBase(self, func):
+        '''Whether a base class of the project declares a virtual func: override on a function overriding nothing does not compile'''
+        return func.parent.hasBase() and func.overrideKey() in self.projectData.inheritedInterface(func.parent)
 
     def __4f_createClassMethodMock(self, func):
         action = self.conditioner.doWhatWithFunction(func)
         if action == CodeGenConditioner.ACT_Ignore:
             return
         elif action == CodeGenConditioner.ACT_DefineEmpty:
-            self._activeCodeWriter.writeln(" ".join([ func.getReturnType(), func.name, func.argsstring, "{}" ] ))
+            self._activeCodeWriter.writeln(_renderDeclaration(func.getReturnType(), func.name, func.argsstring, "{}"))
         elif action == CodeGenConditioner.ACT_KeepOrigin:
-            self._activeCodeWriter.writeln(" ".join([ func.getReturnType(), func.name, func.argsstring, ";" ] ))
+            self._activeCodeWriter.writeln(_renderDeclaration(func.getReturnType(), func.name, func.argsstring, ";"))
         else: #action == CodeGenConditioner.ACT_GenMock
             if func.hasDefaultParam():
                 self.__4f_createMockMethodWithDefaultParam(func)
@@ -290,9 +502,6 @@ class GmockCodeGentor(ICodeGentor):
         theCallToGlobalMockMethod = self._curHeaderInfo.getGlobalMockClassInstance() + "." + func.name
         self._activeCodeWriter.writeln("static inline " + self.__4f_createFuncThatCallsToOtherFunc(func, theCallToGlobalMockMethod))
 
-    def __pickCodeUnitsInCurrentHeader(self, codeUnitList):
-        return [cobj for cobj in codeUnitList if cobj.location.file == self._curHeaderInfo.header.location.file]
-
     def __pickSpecificCodeUnits(self, codeUnitList, kind):
         return [unit for unit in codeUnitList if unit.kind == kind]
 
@@ -303,7 +512,7 @@ class GmockCodeGentor(ICodeGentor):
             totalList += codeUnitList
 
         # sort to make sure the order is correct
-        totalList.sort(key=lambda obj: obj.location.line)
+        totalList.sort(key=_byLine)
         for cobj in totalList:
             cobj.exposeTo(self)
 
@@ -336,12 +545,27 @@ class GmockCodeGentor(ICodeGentor):
         cls.exposeTo(self)
         self._activeCodeWriter.writeln("static {0} {1};".format(self._curHeaderInfo.getGlobalMockClassName(), self._curHeaderInfo.getGlobalMockClassInstance()))
 
-    def __createWriter(self, path):
+    def __createWriter(self, path, incremental = False):
+        if self._renderedFiles != None:
+            return CppCodeWriter.new("memory", path)
         print("Start writing to " + path)
         if gbWriteConsole == True:
             return CppCodeWriter.new("console", path)
+        elif self.incremental or incremental:
+            return CppCodeWriter.new("incremental", path)
+        else:
+            return CppCodeWriter.new("buffered", path)
+
+    def __closeWriter(self, writer):
+        if self._renderedFiles != None:
+            writer.close()
+            self._renderedFiles.append((writer.name(), writer.content))
+        elif writer.close():
+            self.writtenFiles += 1
+            if gbWriteConsole == False:
+                self.bytesWritten += os.path.getsize(writer.name())
         else:
-            return CppCodeWriter.new("file", path)
+            self.skippedFiles += 1
 
 class NormalMockConditioner(CodeGenConditioner):
     def __init__(self): self.projectData = None
@@ -357,7 +581,7 @@ class NormalMockConditioner(CodeGenConditioner):
             return CodeGenConditioner.ACT_Ignore
 
         # type == "" means Constructor
-        funcDefinedByLanguage = re.match("\(.*\)\s*=", func.argsstring) != None and not func.isPureVirtual()
+        funcDefinedByLanguage = "=" in func.argsstring and _definedByLanguage.match(func.argsstring) != None and not func.isPureVirtual()
         if funcDefinedByLanguage:
             return CodeGenConditioner.ACT_KeepOrigin
         elif func.isConstructor():
@@ -0,0 +1,651 @@
+'''
+Doxygen-free front end: a light C++ declaration scanner producing the same Project model as XMLParser.
+It understands what the mocks are made of (namespaces, classes/structs and their bases, access sections,
+functions, enums, typedefs/aliases, variables, includes) and skips everything else: function bodies,
+initializers, template arguments, attributes and the preprocessor conditionals (both branches are read).
+'''
+import re
+import xmlutil
+from data import *
+from dataparser import DataParser
+from environ import *
+
+_COMMENT_OR_LITERAL = re.compile(r'//[^\n]*|/\*.*?\*/|"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'', re.S)
+_INCLUDE = re.compile(r'\s*#\s*include\s*([<"])([^>"]+)[>"]')
+_TOKEN = re.compile(r'''
+    [A-Za-z_]\w*
+    |\.?\d(?:[\w.]|[eEpP][-+])*
+    |"(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*'
+    |::|->\*|->|\.\.\.|<<=|<<|<=|>=|==|!=|&&|\|\||\+\+|--|[-+*/%^&|!]=
+    |\S
+''', re.X)
+
+_ACCESS_SPECIFIERS = set(["public", "protected", "private"])
+_FUNCTION_SPECIFIERS = set(["virtual", "static", "inline", "explicit", "constexpr", "extern", "friend", "mutable"])
+_SKIPPED_STATEMENTS = set(["friend", "static_assert", "namespace", "using", "template", "asm"])
+_ATTRIBUTE_MACROS = set(["__attribute__", "__declspec", "alignas"])
+# tokens which can end a type, a parameter made of them only has no name
+_TYPE_KEYWORDS = set(["void", "bool", "char", "wchar_t", "char16_t", "char32_t", "short", "int", "long", "float", "double",
+                      "signed", "unsigned", "const", "volatile", "auto"])
+_NO_SPACE_AFTER = set(["::", "(", "[", "~", "*", "&", "&&", "<", "!"])
+_NO_SPACE_BEFORE = set(["::", ",", ")", "]", "(", "[", "<", ">"])
+
+def _joinTokens(tokens):
+    '''Spell the tokens of a type or an expression the way doxygen does: "const std::map< int, T * > &"'''
+    text = ""
+    previous = None
+    for token in tokens:
+        if previous != None:
+            if token == ">":
+                text += " "
+            elif previous == "<":
+                text += " "
+            elif previous not in _NO_SPACE_AFTER and token not in _NO_SPACE_BEFORE:
+                text += " "
+            elif previous in ("*", "&", "&&") and token in ("*", "&", "&&", "const"):
+                text += "" if token != "const" else " "
+        text += token
+        previous = token
+    return text
+
+def _refid(prefix, name):
+    '''Mimic the doxygen refids: namespaceouter_1_1inner, classouter_1_1_my_class, _my_header_8h'''
+    escaped = []
+    for c in name:
+        if c == "_": escaped.append("__")
+        elif c == ":": escaped.append("_1")
+        elif c == ".": escaped.append("_8")
+        elif c.isupper(): escaped.append("_" + c.lower())
+        elif c.isalnum(): escaped.append(c)
+        else: escaped.append("_{0:x}".format(ord(c)))
+    return prefix + "".join(escaped)
+
+def _closingIndex(tokens, i):
+    '''Index of the bracket closing the one at tokens[i]: (), [], {} are nested, <> only when they are balanced'''
+    opening = tokens[i]
+    closing = {"(": ")", "[": "]", "{": "}", "<": ">"}[opening]
+    depth = 0
+    for j in range(i, len(tokens)):
+        if tokens[j] == opening:
+            depth += 1
+        elif tokens[j] == closing:
+            depth -= 1
+            if depth == 0:
+                return j
+        elif opening == "<" and tokens[j] in (";", "{", "}"):
+            break
+    return len(tokens) - 1 if opening != "<" else i
+
+def _splitTopLevel(tokens, separator):
+    '''Split tokens at separator when it is outside of any (), [], {} or template argument list'''
+    parts = [[]]
+    depth = 0
+    for i, token in enumerate(tokens):
+        if token in ("(", "[", "{"):
+            depth += 1
+        elif token in (")", "]", "}"):
+            depth -= 1
+        elif token == "<" and i > 0 and _isIdentifier(tokens[i - 1]) and tokens[i - 1] != "operator":
+            depth += 1
+        elif token == ">" and depth > 0:
+            depth -= 1
+        elif token == separator and depth == 0:
+            parts.append([])
+            continue
+        parts[-1].append(token)
+    return parts
+
+def _isIdentifier(token):
+    return token[0].isalpha() or token[0] == "_"
+
+class _Scope:
+    '''Where the scanned declarations go: the Header, a Namespace or a Class'''
+    def __init__(self, compound, qualifiedName, access = "public"):
+        self.compound = compound
+        self.qualifiedName = qualifiedName
+        self.access = access
+
+    def isClass(self):
+        return isinstance(self.compound, Class)
+
+    def qualify(self, name):
+        return self.qualifiedName + "::" + name if self.qualifiedName != "" else name
+
+class HeaderScanner(DataParser):
+    def __init__(self, headerFiles):
+        '''headerFiles: the C++ headers to scan, each one becomes a Header of the Project'''
+        DataParser.__init__(self, "")
+        self.headerFiles = headerFiles
+
+    def parse(self):
+        for headerFile in self.headerFiles:
+            self.scanHeader(headerFile)
+        self._resolveBases()
+        self.project.indexCodeUnits()
+        self.project.ready = True
+        return self.project
+
+    def scanHeader(self, headerFile):
+        with open(headerFile) as f:
+            text = f.read()
+        compoundname = os.path.basename(headerFile)
+        header = self.project.addHeader(_refid("", compoundname))
+        header.kind = "file"
+        header.compoundname = compoundname
+        header.location = CodeUnit.Location(xmlutil.internText(headerFile), 1)
+        header.updateName()
+        header.dataAvailable = True
+
+        self._header = header
+        self._tokens, self._lines = self._tokenize(text, header)
+        end = self._scanBlock(_Scope(header, ""), 0)
+        if end < len(self._tokens):
+            warning("{0}:{1}: unbalanced '}}', the rest of the header is skipped".format(headerFile, self._lines[end - 1]))
+        self._tokens = self._lines = None
+        return header
+
+    @staticmethod
+    def _tokenize(text, header):
+        '''Token texts and their line numbers, the comments and the preprocessor lines are dropped'''
+        def blankComment(match):
+            literal = match.group(0)
+            if literal[0] in "\"'":
+                return literal
+            return "\n" * literal.count("\n") + " "
+        lines = _COMMENT_OR_LITERAL.sub(blankComment, text).split("\n")
+
+        inDirective = False
+        for i, line in enumerate(lines):
+            if inDirective or line.lstrip().startswith("#"):
+                include = _INCLUDE.match(line)
+                if include != None and not inDirective:
+                    header.includes.append(Header.Include(include.group(2), include.group(1) == '"'))
+                inDirective = line.rstrip().endswith("\\")
+                lines[i] = ""
+
+        tokens = []
+        lineNumbers = []
+        for i, line in enumerate(lines):
+            lineTokens = _TOKEN.findall(line)
+            tokens += lineTokens
+            lineNumbers += [i + 1] * len(lineTokens)
+        return tokens, lineNumbers
+
+    def _scanBlock(self, scope, i):
+        '''Scan the declarations from tokens[i] to the "}" closing the block, return the index after it'''
+        tokens = self._tokens
+        statement = i
+        while i < len(tokens):
+            token = tokens[i]
+            if token == "}":
+                return i + 1
+            elif token == ";":
+                self._declare(scope, statement, i)
+                statement = i = i + 1
+            elif token == "{":
+                i = statement = self._scanBraces(scope, statement, i)
+            elif token == ":" and i > statement and tokens[i - 1] in _ACCESS_SPECIFIERS:
+                if i - 1 > statement: # a macro without ";" ends before the access specifier: Q_OBJECT public:
+                    warning("{0}:{1}: '{2}' has no ';', it is skipped".format(
+                        self._header.location.file, self._lines[statement], _joinTokens(tokens[statement:i - 1])))
+                scope.access = tokens[i - 1]
+                statement = i = i + 1
+            elif token in ("(", "["):
+                i = _closingIndex(tokens, i) + 1
+            else:
+                i += 1
+        return i
+
+    def _scanBraces(self, scope, statement, i):
+        '''The statement tokens[statement:i] opens a "{" block, scan or skip it and return the index after it'''
+        tokens = self._tokens
+        head = self._stripDecorations(statement, i)
+        first = tokens[head[0]] if len(head) > 0 else ""
+        if first == "namespace":
+            names = [tokens[k] for k in head[1:] if _isIdentifier(tokens[k]) and tokens[k] != "inline"]
+            if len(names) == 0: # anonymous namespace: its content is not reachable from other files
+                return _closingIndex(tokens, i) + 1
+            return self._scanBlock(self._namespaceScope(scope, names, self._lines[head[1]]), i + 1)
+        elif first == "extern" and len(head) == 2 and tokens[head[1]].startswith('"'):
+            return self._scanBlock(scope, i + 1)
+        elif first in ("class", "struct", "union") and self._isClassHead(head):
+            end = self._scanBlock(self._classScope(scope, head), i + 1)
+            return self._skipDeclarators(end)
+        elif first == "enum":
+            end = _closingIndex(tokens, i)
+            self._declareEnum(scope, head, tokens[i + 1:end])
+            return self._skipDeclarators(end + 1)
+
+        nameIndex = self._functionNameIndex(head)
+        if nameIndex != None:
+            self._declareFunction(scope, head, nameIndex)
+            if any(tokens[k] == ":" for k in head):
+                while tokens[i - 1] not in (")", "}"): # a member initialized with braces: Foo() : a{1} {}
+                    i = self._nextBrace(_closingIndex(tokens, i) + 1)
+            return _closingIndex(tokens, i) + 1
+        end = _closingIndex(tokens, i)
+        # brace initializer: the statement goes on up to its ";"
+        j = end + 1
+        while j < len(tokens) and tokens[j] not in (";", "}"):
+            j = _closingIndex(tokens, j) + 1 if tokens[j] in ("(", "[", "{") else j + 1
+        if j < len(tokens) and tokens[j] == ";":
+            self._declare(scope, statement, j)
+            return j + 1
+        return j
+
+    def _nextBrace(self, i):
+        tokens = self._tokens
+        while i < len(tokens) - 1 and tokens[i] != "{":
+            i = _closingIndex(tokens, i) + 1 if tokens[i] in ("(", "[") else i + 1
+        return i
+
+    def _skipDeclarators(self, i):
+        '''Skip the "} instance, *pointer;" declarators following a class or an enum body'''
+        tokens = self._tokens
+        while i < len(tokens) and tokens[i] not in (";", "}"):
+            i = _closingIndex(tokens, i) + 1 if tokens[i] in ("(", "[", "{") else i + 1
+        return i + 1 if i < len(tokens) and tokens[i] == ";" else i
+
+    def _stripDecorations(self, start, end):
+        '''Indexes of the statement tokens without the template header and the attributes'''
+        tokens = self._tokens
+        kept = []
+        i = start
+        while i < end:
+            token = tokens[i]
+            if token == "template" and i + 1 < end and tokens[i + 1] == "<":
+                i = _closingIndex(tokens, i + 1) + 1
+                continue
+            if token == "[" and i + 1 < end and tokens[i + 1] == "[":
+                i = _closingIndex(tokens, i) + 1
+                continue
+            if token in _ATTRIBUTE_MACROS and i + 1 < end and tokens[i + 1] == "(":
+                i = _closingIndex(tokens, i + 1) + 1
+                continue
+            kept.append(i)
+            i += 1
+        return kept
+
+    def _isClassHead(self, head):
+        '''class/struct/union definition, as opposed to "struct stat info = {...}" or a function returning a struct'''
+        tokens = self._tokens
+        return all(tokens[k] not in ("(", "=") for k in head)
+
+    def _namespaceScope(self, scope, names, line):
+        for name in names:
+            compoundname = scope.qualify(name)
+            ns = self.project.addNamespace(_refid("namespace", compoundname))
+            if not ns.dataAvailable:
+                ns.kind = "namespace"
+                ns.compoundname = compoundname
+                ns.location = CodeUnit.Location(self._header.location.file, line)
+                ns.dataAvailable = True
+            if not self._header.hasNamespace(ns):
+                self._header.namespaces.append(ns)
+            scope = _Scope(ns, compoundname)
+        return scope
+
+    def _classScope(self, scope, head):
+        tokens = self._tokens
+        kind = tokens[head[0]]
+        colon = len(head)
+        for k in range(1, len(head)):
+            if tokens[head[k]] == ":":
+                colon = k
+                break
+        # the last identifier out of the template arguments: "class EXPORT Foo<int> final" --> Foo
+        names = []
+        depth = 0
+        for k in head[1:colon]:
+            if tokens[k] == "<": depth += 1
+            elif tokens[k] == ">": depth -= 1
+            elif depth == 0 and _isIdentifier(tokens[k]) and tokens[k] != "final": names.append(k)
+        if len(names) == 0:
+            return _Scope(None, scope.qualifiedName, "private") # anonymous class: its members are unreachable
+        nameIndex = names[-1]
+        name = tokens[nameIndex]
+
+        compoundname = scope.qualify(name)
+        cls = self.project.addClass(_refid("class" if kind != "struct" else "struct", compoundname))
+        cls.kind = xmlutil.internText("struct" if kind == "struct" else "class")
+        cls.name = name
+        cls.compoundname = compoundname
+        cls.location = CodeUnit.Location(self._header.location.file, self._lines[nameIndex])
+        cls.dataAvailable = True
+
+        defaultAccess = "private" if kind == "class" else "public"
+        inheritInfo = []
+        for base in _splitTopLevel([tokens[k] for k in head[colon + 1:]], ","):
+            accessibility = defaultAccess
+            isVirtual = False
+            while len(base) > 0 and base[0] in _ACCESS_SPECIFIERS | set(["virtual"]):
+                if base[0] == "virtual": isVirtual = True
+                else: accessibility = base[0]
+                base = base[1:]
+            if len(base) > 0:
+                inheritInfo.append(Class.InheritInfo("", _joinTokens(base), accessibility, isVirtual))
+        if len(inheritInfo) > 0:
+            cls.inheritInfo = inheritInfo
+
+        if scope.compound != None and not isinstance(scope.compound, Header):
+            cls.setParent(scope.compound)
+        if not self._header.hasClass(cls):
+            self._header.innerclasses.append(cls)
+        return _Scope(cls, compoundname, defaultAccess)
+
+    def _isVisible(self, scope, isStatic):
+        '''Only what doxygen lists in the sections XMLParser reads: the public non static class members'''
+        if scope.compound == None:
+            return False
+        return not scope.isClass() or (scope.access == "public" and not isStatic)
+
+    def _declare(self, scope, start, end):
+        '''Declare the member of the statement tokens[start:end] ending with ";"'''
+        tokens = self._tokens
+        head = self._stripDecorations(start, end)
+        if len(head) == 0:
+            return
+        first = tokens[head[0]]
+        if first == "typedef":
+            self._declareTypeDef(scope, head[1:], head[0])
+        elif first == "using" and len(head) > 3 and tokens[head[2]] == "=":
+            self._declareAlias(scope, head)
+        elif first in _SKIPPED_STATEMENTS:
+            return
+        else:
+            nameIndex = self._functionNameIndex(head)
+            if nameIndex != None:
+                self._declareFunction(scope, head, nameIndex)
+            elif first not in ("class", "struct", "union", "enum"): # forward declarations are skipped
+                for declarator in self._variableDeclarators(head):
+                    self._declareVariable(scope, *declarator)
+
+    def _functionNameIndex(self, head):
+        '''Position in head of the function name, None when the statement does not declare a function'''
+        tokens = self._tokens
+        depth = 0
+        for k in range(len(head)):
+            token = tokens[head[k]]
+            if token == "operator":
+                return k
+            if token == "<" and k > 0 and _isIdentifier(tokens[head[k - 1]]):
+                depth += 1
+            elif token == ">" and depth > 0:
+                depth -= 1
+            elif token == "=" and depth == 0:
+                return None
+            elif token == "(" and depth == 0:
+                if k == 0 or not _isIdentifier(tokens[head[k - 1]]) or tokens[head[k - 1]] in _TYPE_KEYWORDS:
+                    return None # function pointer, cast or macro call without a name
+                if k + 1 < len(head) and tokens[head[k + 1]] in ("*", "&", "^"):
+                    return None # "void (*callback)(int)" is a variable
+                if k >= 2 and tokens[head[k - 2]] == "::":
+                    return None # out of class definition of a member declared elsewhere
+                return k - 2 if k >= 2 and tokens[head[k - 2]] == "~" else k - 1
+        return None
+
+    def _declareFunction(self, scope, head, nameIndex):
+        tokens = self._tokens
+        specifiers = set(tokens[k] for k in head[:nameIndex] if tokens[k] in _FUNCTION_SPECIFIERS)
+        if "friend" in specifiers:
+            return
+        isStatic = "static" in specifiers
+        if not self._isVisible(scope, isStatic):
+            return
+
+        # name and the opening bracket of the parameters
+        open = nameIndex + 1
+        if tokens[head[nameIndex]] == "operator":
+            if tokens[head[open]] == "(" and open + 1 < len(head) and tokens[head[open + 1]] == ")":
+                open += 2 # operator()
+            while open < len(head) and tokens[head[open]] != "(":
+                open += 1
+            name = "operator" + "".join(tokens[k] for k in head[nameIndex + 1:open])
+            if len(head[nameIndex + 1:open]) > 0 and _isIdentifier(tokens[head[nameIndex + 1]]):
+                name = "operator " + _joinTokens([tokens[k] for k in head[nameIndex + 1:open]]) # conversion
+        else:
+            while tokens[head[open]] != "(":
+                open += 1
+            name = "".join(tokens[k] for k in head[nameIndex:open])
+        if open >= len(head):
+            return
+        closeToken = _closingIndex(tokens, head[open])
+        close = open
+        while close < len(head) and head[close] < closeToken:
+            close += 1
+
+        function = Function()
+        function.kind = "function"
+        function.name = name
+        function.isStatic = isStatic
+        function.scope = xmlutil.internText(scope.access if scope.isClass() else "public")
+        function.explicit = "explicit" in specifiers
+        function.inline = "inline" in specifiers
+        function.location = CodeUnit.Location(self._header.location.file, self._lines[head[nameIndex]])
+
+        returnType = [tokens[k] for k in head[:nameIndex] if tokens[k] not in _FUNCTION_SPECIFIERS and tokens[k][0] != '"']
+        params = [tokens[k] for k in head[open + 1:close]]
+        function.paramsList = self._parameters(params)
+
+        qualifiers = []
+        isPure = False
+        isOverride = False
+        k = close + 1
+        while k < len(head):
+            token = tokens[head[k]]
+            if token == "=" and k + 1 < len(head):
+                value = tokens[head[k + 1]]
+                qualifiers.append("=" + value)
+                isPure = isPure or value == "0"
+                k += 2
+                continue
+            if token == "->": # trailing return type
+                returnType = [tokens[j] for j in head[k + 1:] if tokens[j] not in ("override", "final", "=", "0")]
+                break
+            if token in ("noexcept", "throw") and k + 1 < len(head) and tokens[head[k + 1]] == "(":
+                closeToken = _closingIndex(tokens, head[k + 1])
+                end = k + 1
+                while end < len(head) and head[end] < closeToken:
+                    end += 1
+                qualifiers.append(token + _joinTokens([tokens[j] for j in head[k + 1:end + 1]]))
+                k = end + 1
+                continue
+            if token == ":": # constructor initializer list
+                break
+            if token == "const":
+                function.const = True
+            isOverride = isOverride or token in ("override", "final")
+            qualifiers.append(token)
+            k += 1
+
+        function.type = xmlutil.internText(_joinTokens(returnType))
+        if isPure:
+            function.virtualType = "pure-virtual"
+        elif "virtual" in specifiers or isOverride:
+            function.virtualType = "virtual"
+        else:
+            function.virtualType = "non-virtual"
+        function.virtualType = xmlutil.internText(function.virtualType)
+
+        function.argsstring = "(" + ", ".join(self._parameterText(p) for p in function.paramsList) + ")"
+        if len(qualifiers) > 0:
+            suffix = " ".join(qualifiers)
+            function.argsstring += suffix if suffix.startswith("=") else " " + suffix
+        function.definition = self._definition(specifiers, function.type, scope, name)
+        function.setParent(scope.compound)
+
+    @staticmethod
+    def _parameters(tokens):
+        if tokens == [] or tokens == ["void"]:
+            return []
+        params = []
+        for param in _splitTopLevel(tokens, ","):
+            declaration = param
+            defval = ""
+            parts = _splitTopLevel(param, "=")
+            if len(parts) > 1:
+                declaration = parts[0]
+                defval = _joinTokens(sum([p + ["="] for p in parts[1:]], [])[:-1])
+            name = ""
+            array = ""
+            nameAt = len(declaration) - 1
+            if len(declaration) > 0 and declaration[-1] == "]": # the array dimensions go apart as doxygen does: <array>
+                nameAt = declaration.index("[") - 1
+                array = _joinTokens(declaration[nameAt + 1:])
+                declaration = declaration[:nameAt + 1]
+            if len(declaration) > 1 and nameAt > 0 and _isIdentifier(declaration[nameAt]) \
+                    and declaration[nameAt] not in _TYPE_KEYWORDS and declaration[nameAt - 1] != "::":
+                name = declaration[nameAt]
+                declaration = declaration[:nameAt]
+            params.append(Function.Parameter(xmlutil.internText(_joinTokens(declaration)), name, defval, array))
+        return params
+
+    @staticmethod
+    def _parameterText(param):
+        text = param.type
+        if param.name != "":
+            text += param.name if text.endswith(("*", "&")) else " " + param.name
+        text += param.array
+        if param.defval != "":
+            text += "=" + param.defval
+        return text
+
+    @staticmethod
+    def _definition(specifiers, type, scope, name):
+        prefix = [s for s in ("virtual", "static", "inline", "explicit") if s in specifiers]
+        return " ".join(prefix + ([type] if type != "" else []) + [scope.qualify(name) if scope.isClass() or isinstance(scope.compound, Namespace) else name])
+
+    def _variableDeclarators(self, head):
+        '''(type tokens, name index, suffix tokens) of each "type a = 1, b[2]" declarator'''
+        tokens = self._tokens
+        declarators = []
+        # split the indexes rather than the tokens, they give the line numbers
+        groups = [[]]
+        depth = 0
+        for k in head:
+            token = tokens[k]
+            if token in ("(", "[", "{"): depth += 1
+            elif token in (")", "]", "}"): depth -= 1
+            elif token == "<" and len(groups[-1]) > 0 and _isIdentifier(tokens[groups[-1][-1]]): depth += 1
+            elif token == ">" and depth > 0: depth -= 1
+            elif token == "," and depth == 0:
+                groups.append([])
+                continue
+            groups[-1].append(k)
+
+        typeTokens = None
+        for group in groups:
+            end = len(group)
+            for n, k in enumerate(group):
+                if tokens[k] in ("=", ":") or (tokens[k] == "[" and n > 0) or tokens[k] == "{":
+                    end = n
+                    break
+            if end == 0:
+                continue
+            nameIndex = group[end - 1]
+            if not _isIdentifier(tokens[nameIndex]) or tokens[nameIndex] in _TYPE_KEYWORDS:
+                continue
+            if typeTokens == None:
+                typeTokens = [tokens[k] for k in group[:end - 1]]
+                declaredType = typeTokens
+            else: # "int a, *b": the pointer belongs to b only
+                declaredType = typeTokens + [tokens[k] for k in group[:end - 1]]
+            if len(declaredType) == 0:
+                continue
+            arrays = []
+            n = end
+            while n < len(group) and tokens[group[n]] == "[":
+                close = _closingIndex(tokens, group[n])
+                arrays += tokens[group[n]:close + 1]
+                while n < len(group) and group[n] <= close: n += 1
+            declarators.append((declaredType, nameIndex, arrays))
+        return declarators
+
+    def _declareVariable(self, scope, typeTokens, nameIndex, arrays):
+        tokens = self._tokens
+        specifiers = set(token for token in typeTokens if token in _FUNCTION_SPECIFIERS)
+        isStatic = "static" in specifiers
+        # doxygen lists the variables of the namespaces in a section XMLParser does not read
+        if not scope.isClass() or not self._isVisible(scope, isStatic) or "extern" in specifiers:
+            return
+        variable = Variable()
+        variable.kind = "variable"
+        variable.name = tokens[nameIndex]
+        variable.isStatic = isStatic
+        variable.scope = xmlutil.internText(scope.access)
+        variable.type = xmlutil.internText(_joinTokens([token for token in typeTokens if token not in _FUNCTION_SPECIFIERS]))
+        variable.argsstring = "".join(arrays)
+        variable.definition = self._definition(specifiers, variable.type, scope, variable.name)
+        variable.location = CodeUnit.Location(self._header.location.file, self._lines[nameIndex])
+        variable.setParent(scope.compound)
+
+    def _declareTypeDef(self, scope, head, line):
+        tokens = self._tokens
+        if not self._isVisible(scope, False) or len(head) < 2:
+            return
+        nameAt = len(head) - 1
+        pointer = [k for k in range(len(head) - 2) if tokens[head[k]] == "(" and tokens[head[k + 1]] in ("*", "&")]
+        if len(pointer) > 0: # function pointer: typedef void (*Callback)(int)
+            nameAt = pointer[0] + 2
+        elif tokens[head[-1]] == "]": # array: typedef int Matrix[3][3]
+            nameAt = [tokens[k] for k in head].index("[") - 1
+        argsstring = _joinTokens([tokens[k] for k in head[nameAt + 1:]])
+        if nameAt >= len(head) or not _isIdentifier(tokens[head[nameAt]]):
+            return
+        self._addTypeDef(scope, [tokens[k] for k in head[:nameAt]], head[nameAt], argsstring, "typedef")
+
+    def _declareAlias(self, scope, head):
+        '''using Name = type;'''
+        if not self._isVisible(scope, False):
+            return
+        tokens = self._tokens
+        self._addTypeDef(scope, [tokens[k] for k in head[3:]], head[1], "", "using")
+
+    def _addTypeDef(self, scope, typeTokens, nameIndex, argsstring, keyword):
+        typedef = TypeDef()
+        typedef.kind = "typedef"
+        typedef.name = self._tokens[nameIndex]
+        typedef.scope = xmlutil.internText(scope.access if scope.isClass() else "public")
+        typedef.type = xmlutil.internText(_joinTokens(typeTokens))
+        typedef.argsstring = argsstring
+        if keyword == "using":
+            typedef.definition = "using {0} = {1}".format(scope.qualify(typedef.name), typedef.type)
+        else:
+            typedef.definition = "typedef {0} {1}{2}".format(typedef.type, scope.qualify(typedef.name), argsstring)
+        typedef.location = CodeUnit.Location(self._header.location.file, self._lines[nameIndex])
+        typedef.setParent(scope.compound)
+
+    def _declareEnum(self, scope, head, body):
+        tokens = self._tokens
+        if not self._isVisible(scope, False):
+            return
+        names = []
+        for k in head[1:]:
+            if tokens[k] == ":":
+                break
+            if _isIdentifier(tokens[k]) and tokens[k] not in ("class", "struct"):
+                names.append(k)
+        enum = Enum()
+        enum.kind = "enum"
+        enum.name = tokens[names[-1]] if len(names) > 0 else ""
+        enum.scope = xmlutil.internText(scope.access if scope.isClass() else "public")
+        for value in _splitTopLevel(body, ","):
+            if len(value) == 0:
+                continue
+            initializer = ""
+            if len(value) > 2 and value[1] == "=":
+                initializer = "= " + _joinTokens(value[2:])
+            enum.values.append(Enum.Value(value[0], initializer))
+        enum.location = CodeUnit.Location(self._header.location.file, self._lines[names[-1] if len(names) > 0 else head[0]])
+        enum.setParent(scope.compound)
+
+    def _resolveBases(self):
+        '''Point the InheritInfo of the scanned classes to their base classes, looked up from the enclosing scopes'''
+        classesByName = dict((cls.compoundname, cls) for cls in self.project.classes.values())
+        for cls in self.project.classes.values():
+            if cls.inheritInfo == None:
+                continue
+            for ii in cls.inheritInfo:
+                base = lookupScopedName(classesByName, cls.compoundname, ii.basename)
+                if base != None:
+                    ii.baseref = base.refid
@@ -0,0 +1,58 @@
+import os
+import time
+import json
+import collections
+import contextlib
+from data import LazyCompound
+
+def _cpuTime():
+    '''CPU time of this process and of its terminated children: doxygen and the worker pools'''
+    return sum(os.times()[:4])
+
+class Instrument:
+    '''
+    Timing report of a run: wall and CPU time of its phases, generation time of each header
+    and the counters trended along with them (compounds, members, bytes written)
+    '''
+    def __init__(self):
+        self.phases = collections.OrderedDict() # phase --> { "wall": seconds, "cpu": seconds }
+        self.headers = collections.OrderedDict() # header --> generation wall time in seconds
+        self.counts = collections.OrderedDict()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        wallStart = time.time()
+        cpuStart = _cpuTime()
+        try:
+            yield
+        finally:
+            self.phases[name] = {"wall": time.time() - wallStart, "cpu": _cpuTime() - cpuStart}
+
+    def countProject(self, project):
+        '''Count the compounds and members of project, the lazy compounds never loaded are not counted'''
+        compounds = [compound for compound in list(project.headers.values()) + list(project.namespaces.values()) + list(project.classes.values())
+                     if not isinstance(compound, LazyCompound) or compound.isLoaded()]
+        self.counts["headers"] = len(project.headers)
+        self.counts["compounds"] = len(compounds)
+        self.counts["members"] = sum(len(compound.members()) for compound in compounds)
+
+    def countGeneratedCode(self, codeGentor):
+        self.counts["filesWritten"] = codeGentor.writtenFiles
+        self.counts["filesSkipped"] = codeGentor.skippedFiles
+        self.counts["bytesWritten"] = codeGentor.bytesWritten
+        self.headers.update(codeGentor.headerTimes)
+
+    def report(self):
+        return collections.OrderedDict([("phases", self.phases), ("counts", self.counts), ("headers", self.headers)])
+
+    def writeReport(self, path):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent = 2)
+
+    def summary(self):
+        lines = ["{0:<20} wall {1:8.3f}s  cpu {2:8.3f}s".format(name, times["wall"], times["cpu"]) for name, times in self.phases.items()]
+        lines.append(", ".join("{0} {1}".format(count, name) for name, count in self.counts.items()))
+        slowest = sorted(self.headers.items(), key = lambda item: item[1], reverse = True)[:5]
+        if len(slowest) > 0:
+            lines.append("slowest headers: " + ", ".join("{0} {1:.3f}s".format(name, seconds) for name, seconds in slowest))
+        return "\n".join(lines)
@@ -1,19 +1,47 @@
 import subprocess
 import shutil
+import fnmatch
+import cProfile
+import time
 
 from xmlparser import *
+from headerscanner import *
 from gmockgentor import *
+from cache import *
+from instrument import *
 
 
+WATCH_INTERVAL = 0.5 # seconds between two polls of the input headers in watch mode
+
 class Worker:
     def __init__(self):
-        checkEnviron()
         argParser = ArgParser()
         argParser.parse()
+        if argParser.frontend == "doxygen":
+            checkEnviron()
         self.input = argParser.input
         self.outdir = argParser.outdir
+        self.jobs = argParser.jobs
+        self.useCache = argParser.useCache
+        self.incremental = argParser.incremental
+        self.noCopy = argParser.noCopy
+        self.shards = argParser.shards
+        self.lazy = argParser.lazy
+        self.xmlCacheSize = argParser.xmlCacheSize
+        self.mockStyle = argParser.mockStyle
+        self.aggregate = argParser.aggregate
+        self.mockInherited = argParser.mockInherited
+        self.dataParser = None
+        self.profile = argParser.profile
+        self.watchMode = argParser.watch
+        self.instrument = Instrument()
+        self.cache = None
+        self._inputFiles = []
+        self._dirtyInputs = []
+        self._cachedSlices = {}
+        self._doxygenRunDirs = []
         self.workingDir = os.path.join(self.outdir, ".tmp-mock-workspace")
-        self.dataType = "xml"
+        self.dataType = "xml" if argParser.frontend == "doxygen" else "header"
         self.codeGentorType = "gmocker"
         self.parsed = False
 
@@ -21,58 +49,304 @@ class Worker:
         self._clean()
 
     def dojob(self):
+        profiler = None
+        if self.profile:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        with self.instrument.phase("createWorkspace"):
+            self._createWorkspace()
+        with self.instrument.phase("launchDoxygen"):
+            self._launchDoxygen()
+        with self.instrument.phase("parseDoxygenOutput"):
+            projectData = self._parseDoxygenOutput()
+        with self.instrument.phase("genCode"):
+            codeGentor = self._genCode(projectData)
+        if profiler != None:
+            profiler.disable()
+        if isinstance(self.dataParser, XMLParser):
+            print(self.dataParser.store.report())
+        if self.profile:
+            self._writeProfile(profiler, projectData, codeGentor)
+        self._clean()
+
+    def watch(self):
+        '''
+        Generate the mocks, then keep the Project in memory and poll the input headers: the changed headers
+        are extracted again and merged into the Project, only their mocks are regenerated
+        '''
+        self.incremental = True
         self._createWorkspace()
         self._launchDoxygen()
-        self._genCode(self._parseDoxygenOutput())
+        projectData = self._parseDoxygenOutput()
+        self._genCode(projectData)
+
+        stamps = self._pollInputs()
+        print("Watching {0} header(s), press Ctrl+C to stop".format(len(stamps)))
+        try:
+            while True:
+                time.sleep(WATCH_INTERVAL)
+                current = self._pollInputs()
+                changed = [file for file, stamp in current.items() if stamps.get(file) != stamp]
+                removed = [file for file in stamps if file not in current]
+                stamps = current
+                if len(changed) == 0 and len(removed) == 0:
+                    continue
+                start = time.time()
+                headers = self._refreshHeaders(projectData, changed, removed)
+                self._genCode(projectData, headers)
+                print("{0} header(s) changed, {1} removed, mocks updated in {2:.3f}s".format(len(changed), len(removed), time.time() - start))
+        except KeyboardInterrupt:
+            pass
         self._clean()
 
+    def _pollInputs(self):
+        '''(mtime, size) of each input header, the headers added to the input directories are watched from now on'''
+        names = set(os.path.basename(file) for file in self._inputFiles)
+        for file in self._collectInputFiles([input for input in self.input if os.path.isdir(input)]):
+            if fnmatch.fnmatch(file, HEADER_PATTERN) and os.path.basename(file) not in names:
+                self._inputFiles.append(file)
+                names.add(os.path.basename(file))
+        stamps = {}
+        for file in self._inputFiles:
+            try:
+                stat = os.stat(file)
+            except OSError:
+                continue # removed
+            stamps[file] = (stat.st_mtime, stat.st_size)
+        return stamps
+
+    def _refreshHeaders(self, projectData, changed, removed):
+        '''
+        Replace the changed headers of projectData by a new extraction of them and drop the removed ones with their
+        generated files. Return the headers to generate again: the new headers, and the ones deriving from their classes
+        '''
+        headersByName = dict((os.path.basename(header.location.file), header) for header in projectData.headers.values())
+        oldHeaders = {}
+        bases = {} # compoundname --> refid of the classes in the old and new versions of the headers
+        for file in changed + removed:
+            header = headersByName.get(os.path.basename(file))
+            if header != None:
+                oldHeaders[os.path.basename(file)] = header
+                bases.update((cls.compoundname, cls.refid) for cls in self._classesIn(projectData, header))
+                projectData.removeHeader(header)
+
+        headers = self._extractHeaders(projectData, changed) if len(changed) > 0 else []
+        for header in headers:
+            oldHeaders.pop(os.path.basename(header.location.file), None)
+            bases.update((cls.compoundname, cls.refid) for cls in self._classesIn(projectData, header))
+        for header in oldHeaders.values(): # removed, or not extracted anymore
+            for path in GmockCodeGentor.generatedFiles(self.outdir, header):
+                if os.path.isfile(path):
+                    os.remove(path)
+                    print("Removed " + path)
+        return headers + self._derivedHeaders(projectData, bases, headers)
+
+    def _classesIn(self, projectData, header):
+        return [cls for cls in projectData.classes.values() if cls.location.file == header.location.file]
+
+    def _derivedHeaders(self, projectData, bases, excluded):
+        '''
+        The headers of projectData, but the excluded ones, declaring a class derived from bases { compoundname: refid },
+        directly or not: their overrides and inherited functions follow the bases. The bases of a removed header have
+        no class in projectData anymore, the derived classes are matched by the refid or the name of their bases
+        '''
+        bases = dict(bases)
+        classesByFile = {}
+        for cls in projectData.classes.values():
+            classesByFile.setdefault(cls.location.file, []).append(cls)
+
+        def derived(cls, bases, baseRefids):
+            return cls.hasBase() and any(ii.baseref in baseRefids or lookupScopedName(bases, cls.compoundname, ii.basename) != None
+                                         for ii in cls.inheritInfo)
+        headers = []
+        candidates = [header for header in projectData.headers.values() if header not in excluded]
+        while len(bases) > 0:
+            baseRefids = set(bases.values())
+            found = [header for header in candidates
+                     if any(derived(cls, bases, baseRefids) for cls in classesByFile.get(header.location.file, []))]
+            candidates = [header for header in candidates if header not in found]
+            headers += found
+            bases = dict((cls.compoundname, cls.refid) for header in found for cls in classesByFile.get(header.location.file, []))
+        return headers
+
+    def _extractHeaders(self, projectData, changed):
+        '''Extract the changed headers again and merge them into projectData, return the new headers'''
+        self._dirtyInputs = changed
+        if self.dataType == "xml":
+            runDir = os.path.join(self.workingDir, "watch")
+            if os.path.exists(runDir):
+                shutil.rmtree(runDir) # doxygen must only see the changed headers
+            self._doxygenRunDirs = [runDir]
+            self._prepareDoxygenRun(runDir, changed)
+            self._startExternalCommand(["doxygen", os.path.join(runDir, "Doxyfile")], runDir).wait()
+        parsed = self._createDataParser().parse()
+
+        parsedHeaders = dict((os.path.basename(header.location.file), header) for header in parsed.headers.values())
+        headers = []
+        for file in changed:
+            header = parsedHeaders.get(os.path.basename(file))
+            slice = parsed.detachHeader(header) if header != None else Project()
+            if self.cache != None:
+                self.cache.store(file, slice)
+            projectData.merge(slice)
+            headers += list(slice.headers.values())
+        return headers
+
+    def _writeProfile(self, profiler, projectData, codeGentor):
+        profileDir = os.path.join(self.outdir, ".mock-profile")
+        if not os.path.exists(profileDir):
+            os.makedirs(profileDir)
+        self.instrument.countProject(projectData)
+        self.instrument.countGeneratedCode(codeGentor)
+        profiler.dump_stats(os.path.join(profileDir, "genmock.pstats"))
+        self.instrument.writeReport(os.path.join(profileDir, "timing.json"))
+        print(self.instrument.summary())
+        print("Profile written to {0}".format(profileDir))
+
     def _createWorkspace(self):
         if not os.path.exists(self.outdir):
             print("{0} doesnot exist, create it".format(self.outdir))
             os.makedirs(self.outdir)
+        if self.useCache and os.path.exists(self.workingDir):
+            shutil.rmtree(self.workingDir) # doxygen must only see the headers to re-extract
         if not os.path.exists(self.workingDir):
             os.makedirs(self.workingDir)
 
-        self._copyToWorkspace(self.input)
+        self._inputFiles = self._dropNameCollisions(
+            [file for file in self._collectInputFiles(self.input) if fnmatch.fnmatch(file, HEADER_PATTERN)])
+        self._dirtyInputs = self._inputFiles
+        if self.useCache:
+            self._loadCachedSlices()
+        if self.dataType != "xml":
+            return
 
-        FileWriter(os.path.join(self.workingDir, "Doxyfile")).writeln("GENERATE_HTML=no\nGENERATE_LATEX=no\nGENERATE_XML=yes\nXML_PROGRAMLISTING=no\nFILE_PATTERNS=*.h\nXML_OUTPUT={0}/xml\nINPUT={0}".format(self.workingDir))
+        shards = self._splitIntoShards(self._dirtyInputs)
+        if len(shards) == 1:
+            self._doxygenRunDirs = [self.workingDir]
+        else:
+            self._doxygenRunDirs = [os.path.join(self.workingDir, "shard{0}".format(i)) for i in range(len(shards))]
+        for runDir, shard in zip(self._doxygenRunDirs, shards):
+            self._prepareDoxygenRun(runDir, shard)
 
-    def _copyToWorkspace(self, input):
+    def _splitIntoShards(self, files):
+        shardCount = max(1, min(self.shards, len(files)))
+        shardSize = (len(files) + shardCount - 1) // shardCount
+        return [files[i * shardSize:(i + 1) * shardSize] for i in range(shardCount)] if len(files) > 0 else [files]
+
+    def _prepareDoxygenRun(self, runDir, files):
+        if not os.path.exists(runDir):
+            os.makedirs(runDir)
+        if self.noCopy:
+            doxygenInput = "".join(['\nINPUT+="{0}"'.format(file) for file in files])
+        else:
+            self._copyToWorkspace(files, runDir)
+            doxygenInput = ""
+        if doxygenInput == "":
+            doxygenInput = "\nINPUT={0}".format(runDir)
+
+        FileWriter(os.path.join(runDir, "Doxyfile")).writeln("GENERATE_HTML=no\nGENERATE_LATEX=no\nGENERATE_XML=yes\nXML_PROGRAMLISTING=no\nFILE_PATTERNS={1}\nXML_OUTPUT={0}/xml{2}".format(runDir, HEADER_PATTERN, doxygenInput))
+
+    def _dropNameCollisions(self, files):
+        '''The mocks are named after the header file name, only the first header of a given name is kept'''
+        kept = {}
+        for file in files:
+            name = os.path.basename(file)
+            if name in kept:
+                warning("{0} is skipped, it has the same name as {1}".format(file, kept[name]))
+            else:
+                kept[name] = file
+        return [file for file in files if kept[os.path.basename(file)] == file]
+
+    def _collectInputFiles(self, input):
         if isinstance(input, list):
+            files = []
             for i in input:
-                if os.path.isfile(i):
-                    self._copyToWorkspace(i)
-                elif os.path.isdir(i):
-                    self._copyToWorkspace([ os.path.join(i, file) for file in os.listdir(i) ])
+                if os.path.isfile(i) or os.path.isdir(i):
+                    files += self._collectInputFiles(i)
                 else:
                     print("WARNING: {0} is not a file a directory".format(i))
-
+            return files
         elif os.path.isdir(input):
-            self._copyToWorkspace([ os.path.join(input, file) for file in os.listdir(input) ])
+            return self._collectInputFiles([ os.path.join(input, file) for file in os.listdir(input) ])
         elif os.path.isfile(input):
-            name = os.path.basename(input)
-            print("Copying file {0} to workspace".format(input))
-            shutil.copyfile(input, os.path.join(self.workingDir, name))
+            return [input]
         else:
             errorHelp(input + ": don't know type of this input")
 
+    def _copyToWorkspace(self, files, runDir):
+        for file in files:
+            print("Copying file {0} to workspace".format(file))
+            shutil.copyfile(file, os.path.join(runDir, os.path.basename(file)))
+
+    def _loadCachedSlices(self):
+        self.cache = ProjectCache(os.path.join(self.outdir, ".mock-cache"), toolVersion() + self.dataType)
+        self._cachedSlices = {}
+        for file in self._inputFiles:
+            slice = self.cache.load(file)
+            if slice != None:
+                self._cachedSlices[file] = slice
+        self._dirtyInputs = [file for file in self._inputFiles if file not in self._cachedSlices]
+        print("{0} header(s) loaded from cache, {1} to extract".format(len(self._cachedSlices), len(self._dirtyInputs)))
+
+    def _mergeWithCache(self, parsed):
+        '''Store the freshly parsed headers in the cache then assemble the whole Project from the cache slices'''
+        parsedHeaders = {}
+        for header in list(parsed.headers.values()):
+            parsedHeaders[os.path.basename(header.location.file)] = header
+
+        project = Project()
+        for file in self._inputFiles:
+            slice = self._cachedSlices.get(file)
+            if slice == None:
+                header = parsedHeaders.pop(os.path.basename(file), None)
+                if header != None:
+                    slice = parsed.detachHeader(header)
+                else:
+                    slice = Project() # not a header doxygen extracts, remember it as empty
+                self.cache.store(file, slice)
+            project.merge(slice)
+        project.ready = True
+        return project
 
     def _launchDoxygen(self):
-        os.chdir(self.workingDir)
-        self._runExternalCommand("doxygen",  os.path.join(self.workingDir, "Doxyfile"))
+        if self.dataType != "xml":
+            return
+        if len(self._dirtyInputs) == 0:
+            print("All headers are up to date in cache, doxygen is not needed")
+            return
+        # the shards are extracted concurrently, each one into its own xml directory
+        processes = [self._startExternalCommand(["doxygen", os.path.join(runDir, "Doxyfile")], runDir) for runDir in self._doxygenRunDirs]
+        for process in processes:
+            process.wait()
 
     def _parseDoxygenOutput(self):
-        dataParser = XMLParser(os.path.join(self.workingDir, "xml"))
-        return dataParser.parse()
+        if self.cache == None:
+            dataParser = self._createDataParser()
+            return dataParser.parse()
+
+        parsed = Project()
+        if len(self._dirtyInputs) > 0:
+            parsed = self._createDataParser().parse()
+        return self._mergeWithCache(parsed)
+
+    def _createDataParser(self):
+        if self.dataType == "header":
+            self.dataParser = HeaderScanner(self._dirtyInputs)
+        else:
+            xmlDirs = [os.path.join(runDir, "xml") for runDir in self._doxygenRunDirs]
+            if len(xmlDirs) == 1:
+                xmlDirs = xmlDirs[0]
+            self.dataParser = XMLParser(xmlDirs, self.jobs, self.lazy, self.xmlCacheSize)
+        return self.dataParser
 
-    def _genCode(self, projectData):
-        codeGentor = GmockCodeGentor(projectData, self.outdir)
-        codeGentor.genCode()
+    def _genCode(self, projectData, headers = None):
+        codeGentor = GmockCodeGentor(projectData, self.outdir, incremental = self.incremental, jobs = self.jobs,
+                                     mockStyle = self.mockStyle, aggregate = self.aggregate, mockInherited = self.mockInherited)
+        codeGentor.genCode(headers)
+        return codeGentor
 
-    def _runExternalCommand(self, command, argsStr):
-        process = subprocess.Popen([command, argsStr])
-        ret = process.wait()
-        return ret
+    def _startExternalCommand(self, args, cwd):
+        return subprocess.Popen(args, cwd = cwd)
 
     def _clean(self):
         if self.workingDir != "":
@@ -87,7 +361,11 @@ class Worker:
             print("Workspace cleaned!")
 
 if __name__ == "__main__":
-    Worker().dojob()
+    worker = Worker()
+    if worker.watchMode:
+        worker.watch()
+    else:
+        worker.dojob()
 
     # wsp = Worker(["/home/cgo1hc/samba/views/nincg3_GEN/ai_projects/generated/components/asf/asf/NavigationService/dbus/src-gen/org/bosch/cm/navigation/NavigationServiceConst.h"], "/home/cgo1hc/Desktop/sds_adapter_mock")
     # wsp.dojob()
@@ -0,0 +1,50 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data import *
+from cache import ProjectCache
+
+class ProjectCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.workDir = tempfile.mkdtemp()
+        self.headerPath = os.path.join(self.workDir, "Base.h")
+        with open(self.headerPath, "w") as f:
+            f.write("class Base {};\n")
+        self.cacheDir = os.path.join(self.workDir, "cache")
+        self.cache = ProjectCache(self.cacheDir, "1")
+
+    def tearDown(self):
+        shutil.rmtree(self.workDir, ignore_errors = True)
+
+    def _slice(self):
+        project = Project()
+        func = Function()
+        func.name = "run"
+        func.paramsList.append(Function.Parameter("int", "n", ""))
+        project.addClass("class_base").adoptFunction(func)
+        return project
+
+    def testRoundTrip(self):
+        self.cache.store(self.headerPath, self._slice())
+        project = self.cache.load(self.headerPath)
+        self.assertEqual(project.classes["class_base"].functions[0].paramsList[0].name, "n")
+        self.assertEqual(self.cache.hits, 1)
+
+    def testUnpicklableSliceIsLeftUncached(self):
+        project = self._slice()
+        project.hook = lambda: None
+        self.cache.store(self.headerPath, project)
+        self.assertEqual(os.listdir(self.cacheDir), [])
+        self.assertEqual(self.cache.load(self.headerPath), None)
+
+    def testUnwritableCacheIsLeftUncached(self):
+        shutil.rmtree(self.cacheDir)
+        self.cache.store(self.headerPath, self._slice())
+        self.assertEqual(self.cache.load(self.headerPath), None)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import os
+import sys
+import pickle
+import unittest
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data import *
+
+class PickleTest(unittest.TestCase):
+    def _project(self):
+        project = Project()
+        header = project.addHeader("_base_8h")
+        header.location = CodeUnit.Location("/include/Base.h", 1)
+        header.includes.append(Header.Include("string", False))
+        cls = project.addClass("class_impl")
+        cls.compoundname = cls.name = "Impl"
+        cls.inheritInfo = [Class.InheritInfo("class_base", "Base", "public", False)]
+        func = Function()
+        func.name = "run"
+        func.paramsList.append(Function.Parameter("int", "n", "0"))
+        cls.adoptFunction(func)
+        enum = Enum()
+        enum.name = "Mode"
+        enum.values.append(Enum.Value("Fast", "1"))
+        cls.adoptEnum(enum)
+        header.adoptClass(cls)
+        return project
+
+    def testRoundTrip(self):
+        # the --jobs processes and the --cache entries pickle the model, on python 2 as well
+        project = pickle.loads(pickle.dumps(self._project(), pickle.HIGHEST_PROTOCOL))
+        header = project.headers["_base_8h"]
+        cls = project.classes["class_impl"]
+        self.assertEqual(header.location.file, "/include/Base.h")
+        self.assertEqual((header.includes[0].file, header.includes[0].islocal), ("string", False))
+        self.assertIs(header.innerclasses[0], cls)
+        self.assertEqual(cls.inheritInfo[0].basename, "Base")
+        self.assertEqual(cls.functions[0].paramsList[0].defval, "0")
+        self.assertIs(cls.functions[0].parent, cls)
+        self.assertEqual(cls.enums[0].values[0].initializer, "1")
+        self.assertIsInstance(cls.functions[0].paramsList[0], Function.Parameter)
+
+if __name__ == "__main__":
+    unittest.main()
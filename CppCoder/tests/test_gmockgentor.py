@@ -0,0 +1,74 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from headerscanner import HeaderScanner
+from gmockgentor import GmockCodeGentor
+
+class ModernMockTest(unittest.TestCase):
+    def setUp(self):
+        self.workDir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.workDir, ignore_errors = True)
+
+    def _mock(self, text):
+        path = os.path.join(self.workDir, "Shapes.h")
+        with open(path, "w") as f:
+            f.write(text)
+        outdir = os.path.join(self.workDir, "out")
+        os.mkdir(outdir)
+        stdout = sys.stdout
+        sys.stdout = StringIO()
+        try:
+            GmockCodeGentor(HeaderScanner([path]).parse(), outdir, mockStyle = "modern").genCode()
+        finally:
+            sys.stdout = stdout
+        with open(os.path.join(outdir, "Shapes_mock.h")) as f:
+            return [line.strip() for line in f if "MOCK_METHOD" in line]
+
+    def testFinalWithoutBase(self):
+        mocks = self._mock("class Leaf {\npublic:\n    virtual void draw() final;\n};\n")
+        self.assertEqual(mocks, ["MOCK_METHOD(void, draw, (), (final));"])
+
+    def testFinalOverridingBase(self):
+        mocks = self._mock("class Shape {\npublic:\n    virtual void draw();\n};\n"
+                           "class Leaf : public Shape {\npublic:\n    void draw() final;\n};\n")
+        self.assertEqual(mocks, ["MOCK_METHOD(void, draw, ());", "MOCK_METHOD(void, draw, (), (override, final));"])
+
+    def testRenamedMockOfDefaultParameterOverridesNothing(self):
+        mocks = self._mock("class Shape {\npublic:\n    virtual void scale(double ratio) const;\n};\n"
+                           "class Circle : public Shape {\npublic:\n    void scale(double ratio = 1.0) const override;\n};\n")
+        self.assertEqual(mocks[1], "MOCK_METHOD(void, scale_mock, (double ratio), (const));")
+
+class ConcurrentGenerationTest(unittest.TestCase):
+    def setUp(self):
+        self.workDir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.workDir, ignore_errors = True)
+
+    def testBytesWrittenOfNonAsciiHeader(self):
+        path = os.path.join(self.workDir, "Label.h")
+        with open(path, "wb") as f:
+            f.write(b'class Label {\npublic:\n    virtual void set(const char* text = "\xc3\xa9chelle");\n};\n')
+        outdir = os.path.join(self.workDir, "out")
+        os.mkdir(outdir)
+        codeGentor = GmockCodeGentor(HeaderScanner([path]).parse(), outdir, jobs = 2)
+        stdout = sys.stdout
+        sys.stdout = StringIO()
+        try:
+            codeGentor.genCode()
+        finally:
+            sys.stdout = stdout
+        self.assertEqual(codeGentor.bytesWritten, sum(os.path.getsize(os.path.join(outdir, f)) for f in os.listdir(outdir)))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from headerscanner import HeaderScanner
+from gmockgentor import GmockCodeGentor
+
+class HeaderScannerTest(unittest.TestCase):
+    def setUp(self):
+        self.workDir = tempfile.mkdtemp()
+        self.stderr = sys.stderr
+        sys.stderr = StringIO()
+
+    def tearDown(self):
+        sys.stderr = self.stderr
+        shutil.rmtree(self.workDir, ignore_errors = True)
+
+    def _scan(self, text, name = "Base.h"):
+        path = os.path.join(self.workDir, name)
+        with open(path, "w") as f:
+            f.write(text)
+        return HeaderScanner([path]).parse()
+
+    def _mock(self, project, name = "Base"):
+        outdir = os.path.join(self.workDir, "out")
+        os.mkdir(outdir)
+        stdout = sys.stdout
+        sys.stdout = StringIO()
+        try:
+            GmockCodeGentor(project, outdir).genCode()
+        finally:
+            sys.stdout = stdout
+        with open(os.path.join(outdir, name + "_mock.h")) as f:
+            return f.read()
+
+    def _onlyClass(self, project):
+        self.assertEqual(len(project.classes), 1)
+        return list(project.classes.values())[0]
+
+    def testAccessSpecifierAfterMacro(self):
+        project = self._scan("class Widget {\n    Q_OBJECT\npublic:\n    virtual void show();\n};\n")
+        self.assertEqual([f.name for f in self._onlyClass(project).functions], ["show"])
+        self.assertIn("'Q_OBJECT' has no ';'", sys.stderr.getvalue())
+
+    def testAccessSpecifierAfterMacroCall(self):
+        project = self._scan("class Widget {\n    DECLARE_TYPE(Widget)\npublic:\n    virtual void show();\n};\n")
+        self.assertEqual([f.name for f in self._onlyClass(project).functions], ["show"])
+        self.assertIn("'DECLARE_TYPE(Widget)' has no ';'", sys.stderr.getvalue())
+
+    def testFunctionPointerAlias(self):
+        project = self._scan("class Button {\npublic:\n    using Cb = void(*)(int);\n    typedef void (*Handler)(int);\n    virtual void click();\n};\n")
+        mock = self._mock(project)
+        self.assertIn("using Cb = void(*)(int);", mock)
+        self.assertIn("typedef void(* Handler)(int);", mock)
+
+    def testArrayParameter(self):
+        project = self._scan("class Grid {\npublic:\n    virtual void fill(int arr[4], int[2][3]);\n};\n")
+        func = self._onlyClass(project).functions[0]
+        self.assertEqual([(p.type, p.name, p.array) for p in func.paramsList], [("int", "arr", "[4]"), ("int", "", "[2][3]")])
+        self.assertEqual(func.argsstring, "(int arr[4], int[2][3])")
+        self.assertIn("MOCK_METHOD2(fill, void (int arr[4], int [2][3]) );", self._mock(project))
+
+    def testHeaderRefidLikeDoxygen(self):
+        project = self._scan("class Base {};\n")
+        self.assertEqual(list(project.headers), ["_base_8h"])
+
+if __name__ == "__main__":
+    unittest.main()
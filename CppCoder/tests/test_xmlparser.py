@@ -0,0 +1,40 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from xmlparser import XMLParser
+from benchmark import writeSyntheticCorpus
+
+class PrefetchTest(unittest.TestCase):
+    def setUp(self):
+        self.xmlDir = tempfile.mkdtemp()
+        writeSyntheticCorpus(self.xmlDir, 4, 2, 3, 4, 2)
+        self.parentReads = []
+        parentPid = os.getpid()
+        readCompound = XMLParser._readCompound
+
+        def countingRead(refid, xmlfilePath):
+            # the forked workers inherit the patch, only the reads of this process count
+            if os.getpid() == parentPid:
+                self.parentReads.append(refid)
+            return readCompound(refid, xmlfilePath)
+        XMLParser._readCompound = staticmethod(countingRead)
+        self.addCleanup(setattr, XMLParser, "_readCompound", staticmethod(readCompound))
+
+    def tearDown(self):
+        shutil.rmtree(self.xmlDir, ignore_errors = True)
+
+    def testNoParentReadWithJobs(self):
+        project = XMLParser(self.xmlDir, jobs = 2).parse()
+        self.assertEqual(self.parentReads, [])
+        self.assertEqual(len(project.classes), 4 * 2 * 3)
+
+    def testSerialParseReadsEveryCompound(self):
+        project = XMLParser(self.xmlDir, jobs = 1).parse()
+        self.assertEqual(len(self.parentReads), len(project.headers) + len(project.namespaces) + len(project.classes))
+
+if __name__ == "__main__":
+    unittest.main()
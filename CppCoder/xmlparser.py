@@ -1,3 +1,6 @@
+import copy
+import multiprocessing
+import collections
 import xmlutil
 from data import *
 from dataparser import DataParser
@@ -9,35 +12,166 @@ def _toLineNumber(string):
     except:
         return 0
 
+class CompoundRecord(CodeUnit):
+    '''
+    Plain, picklable image of one <refid>.xml file: everything XMLParser needs to attach
+    the compound to the Project graph, without holding any reference into that graph:
+    1. members: detached Variable/Function/Enum/TypeDef objects, in document order
+    2. includes, inheritInfo: Header.Include and Class.InheritInfo objects
+    3. innernamespaces, innerclasses: refids of the nested compounds
+    '''
+    def __init__(self, refid):
+        CodeUnit.__init__(self)
+        self.refid = refid
+        self.compoundname = ""
+        self.members = []
+        self.includes = []
+        self.innernamespaces = []
+        self.innerclasses = []
+        self.inheritInfo = []
+
+    def copy(self):
+        '''
+        A copy another compound can adopt the members of: the members and InheritInfo of a record are attached to
+        the Project graph by the compound it is extracted into, they cannot be handed out twice
+        '''
+        record = copy.copy(self)
+        record.members = [copy.copy(member) for member in self.members]
+        record.inheritInfo = [copy.copy(ii) for ii in self.inheritInfo]
+        return record
+
+class CompoundStore:
+    '''
+    Lookup layer of the <refid>.xml files: each xml directory is listed once instead of stating the files
+    one by one, and the records read last are kept in a LRU of `capacity` records. A record found in the LRU
+    is handed out as a copy, the one kept there may already be adopted
+    '''
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._dirFiles = {} # xml directory --> names of its files
+        self._records = collections.OrderedDict() # xml file path --> CompoundRecord, the least recently used first
+
+    def exists(self, xmlfilePath):
+        xmlDir, name = os.path.split(xmlfilePath)
+        files = self._dirFiles.get(xmlDir)
+        if files == None:
+            files = self._dirFiles[xmlDir] = set(os.listdir(xmlDir)) if os.path.isdir(xmlDir) else set()
+        return name in files
+
+    def get(self, refid, xmlfilePath):
+        record = self._records.pop(xmlfilePath, None)
+        if record != None:
+            self.hits += 1
+            self.put(xmlfilePath, record)
+            return record.copy()
+        self.misses += 1
+        record = XMLParser._readCompound(refid, xmlfilePath)
+        self.put(xmlfilePath, record)
+        return record
+
+    def put(self, xmlfilePath, record):
+        self._records[xmlfilePath] = record
+        if len(self._records) > self.capacity:
+            self._records.popitem(last = False)
+
+    def report(self):
+        return "Compound lookups: {0} hit(s), {1} miss(es) with a cache of {2} record(s)".format(self.hits, self.misses, self.capacity)
+
+def _readCompoundFile(args):
+    '''Entry point of the worker processes, must stay at module level to be picklable'''
+    refid, xmlfilePath = args
+    return XMLParser._readCompound(refid, xmlfilePath)
+
 class XMLParser(DataParser):
     __kindsOfSectionVisibleToWorld = set(["public-func", "public-attrib", "public-type" , "enum", "func", "typedef" ])
 
-    def __init__(self, workingDir):
+    def __init__(self, workingDir, jobs = 1, lazy = False, xmlCacheSize = 1000):
+        '''
+        workingDir: the doxygen xml output directory, or a list of them when doxygen ran on shards of the input
+        lazy: only extract the headers, their namespaces and classes are extracted the first time they are used
+        xmlCacheSize: number of compound records kept in memory for the repeated lookups
+        '''
         DataParser.__init__(self, workingDir)
+        self.jobs = jobs
+        self.lazy = lazy
+        self.store = CompoundStore(xmlCacheSize)
+        self.xmlDirs = workingDir if isinstance(workingDir, list) else [workingDir]
+        self._compoundDirs = {} # refid --> xml directories having the compound, namespaces may span several shards
+        self._classRefids = {} # qualified name --> refid of the classes listed in the indexes
+        self._prefetched = {}
 
     def parse(self):
-        indexxmlRoot = xmlutil.createXMLDB(os.path.join(self.workingDir, "index.xml"))
-        for compound in indexxmlRoot.iter("compound"):
-            kind = compound.get("kind")
-            refid = compound.get("refid")
-            if kind == "file":
-                self.project.addHeader(refid)
-            elif kind == "namespace":
-                self.project.addNamespace(refid)
-            elif kind == "class" or kind == "struct":
-                cls = self.project.addClass(refid)
+        for xmlDir in self.xmlDirs:
+            indexxmlRoot = xmlutil.createXMLDB(os.path.join(xmlDir, "index.xml"))
+            for compound in indexxmlRoot.iter("compound"):
+                kind = compound.get("kind")
+                refid = compound.get("refid")
+                if kind == "file":
+                    self.project.addHeader(refid)
+                elif kind == "namespace":
+                    self._addNamespace(refid)
+                elif kind == "class" or kind == "struct":
+                    self._addClass(refid)
+                    self._classRefids.setdefault(xmlutil.findText(compound, "name"), refid)
+                else:
+                    continue
+                self._compoundDirs.setdefault(refid, []).append(xmlDir)
+        if self.jobs > 1 and self.lazy:
+            self._prefetchCompounds(list(self.project.headers))
+        elif self.jobs > 1:
+            self._prefetchCompounds(list(self.project.headers) + list(self.project.namespaces) + list(self.project.classes))
+
         def parseComounds(compoundMap, extractFunc):
             for cmp in compoundMap.values():
                 self._makeCompoundDataAvailable(cmp, extractFunc)
 
         parseComounds(self.project.headers, XMLParser._extractHeaderInfo)
-        parseComounds(self.project.namespaces, XMLParser._extractNamespaceInfo)
-        parseComounds(self.project.classes, XMLParser._extractClassInfo)
-
+        if not self.lazy:
+            parseComounds(self.project.namespaces, XMLParser._extractNamespaceInfo)
+            parseComounds(self.project.classes, XMLParser._extractClassInfo)
+            self.project.indexCodeUnits()
+        self._prefetched = {}
         self.project.ready = True
 
         return self.project
 
+    def _prefetchCompounds(self, refids):
+        '''
+        Read the compound files of refids on a pool of self.jobs processes, the records are
+        consumed by _findCompound in the same order as the serial parsing does
+        '''
+        tasks = [(refid, self._compoundPath(refid, xmlDir)) for refid in refids for xmlDir in self._compoundDirs.get(refid, [None])]
+        tasks = [task for task in tasks if self.store.exists(task[1])]
+        if len(tasks) == 0:
+            return
+        pool = multiprocessing.Pool(self.jobs)
+        try:
+            records = pool.map(_readCompoundFile, tasks, max(1, len(tasks) // (self.jobs * 4)))
+        finally:
+            pool.close()
+            pool.join()
+        for task, record in zip(tasks, records):
+            self._prefetched[task[1]] = record
+
+
+    def _addNamespace(self, refid):
+        if self.lazy and refid not in self.project.namespaces:
+            self.project.namespaces[refid] = LazyNamespace(refid, self._loadCompound)
+        return self.project.addNamespace(refid)
+
+    def _addClass(self, refid):
+        if self.lazy and refid not in self.project.classes:
+            self.project.classes[refid] = LazyClass(refid, self._loadCompound)
+        return self.project.addClass(refid)
+
+    def _loadCompound(self, compound):
+        '''Loader of the lazy compounds, called the first time the compound is used'''
+        if isinstance(compound, Class):
+            self._makeCompoundDataAvailable(compound, XMLParser._extractClassInfo)
+        else:
+            self._makeCompoundDataAvailable(compound, XMLParser._extractNamespaceInfo)
 
     def _makeCompoundDataAvailable(self, compound, extractFunc):
         if extractFunc(self, compound) == True:
@@ -49,9 +183,9 @@ class XMLParser(DataParser):
     def _extractCodeUnitInfo(codeunit, xmlelem):
         assert (isinstance(codeunit, CodeUnit))
         if codeunit.location == None: codeunit.location = CodeUnit.Location()
-        codeunit.kind = xmlutil.getText(xmlelem, "kind")
+        codeunit.kind = xmlutil.internText(xmlutil.getText(xmlelem, "kind"))
         codeunit.name = xmlutil.findText(xmlelem, "name")
-        codeunit.location.file = xmlutil.findTagProp(xmlelem, "location", "file")
+        codeunit.location.file = xmlutil.internText(xmlutil.findTagProp(xmlelem, "location", "file"))
         codeunit.location.line = _toLineNumber(xmlutil.findTagProp(xmlelem, "location", "line"))
 
     @staticmethod
@@ -59,7 +193,7 @@ class XMLParser(DataParser):
         assert (isinstance(member, Member))
         XMLParser._extractCodeUnitInfo(member, xmlMemberdef)
         member.isStatic = (xmlutil.getText(xmlMemberdef, "static") == "yes")
-        member.scope = xmlutil.getText(xmlMemberdef, "prot")
+        member.scope = xmlutil.internText(xmlutil.getText(xmlMemberdef, "prot"))
 
     @staticmethod
     def _extractHasTypeMemberInfo(member, xmlMemberdef):
@@ -67,7 +201,7 @@ class XMLParser(DataParser):
         XMLParser._extractMemberInfo(member, xmlMemberdef)
         member.argsstring = xmlutil.findText(xmlMemberdef, "argsstring")
         member.definition = xmlutil.findText(xmlMemberdef, "definition")
-        member.type = xmlutil.joinTextOfEntireChildren(xmlMemberdef.find("type")).replace("inline::", "").replace("const::", "")
+        member.type = xmlutil.internText(xmlutil.joinTextOfEntireChildren(xmlMemberdef.find("type")).replace("inline::", "").replace("const::", ""))
 
     @staticmethod
     def _extractTypeDefInfo(typedef, xmlMemberDef):
@@ -81,13 +215,14 @@ class XMLParser(DataParser):
         function.explicit = (xmlMemberdef.get("explicit") == "yes")
         function.inline = (xmlMemberdef.get("explicit") == "yes")
         function.const = (xmlMemberdef.get("const") == "yes")
-        function.virtualType = xmlMemberdef.get("virt")
+        function.virtualType = xmlutil.internText(xmlMemberdef.get("virt"))
 
         function.paramsList += \
             [
-                Function.Parameter(xmlutil.joinTextOfEntireChildren(xmlparam.find("type")),
+                Function.Parameter(xmlutil.internText(xmlutil.joinTextOfEntireChildren(xmlparam.find("type"))),
                                    xmlutil.findText(xmlparam, "declname"),
-                                   xmlutil.findText(xmlparam, "defval"))
+                                   xmlutil.findText(xmlparam, "defval"),
+                                   xmlutil.findText(xmlparam, "array"))
                 for xmlparam in xmlMemberdef.iter("param")
             ]
 
@@ -109,50 +244,77 @@ class XMLParser(DataParser):
                 ]
 
     @staticmethod
-    def _extractCompoundTypeInfo(compound, xmlCompounddef):
-        XMLParser._extractCodeUnitInfo(compound, xmlCompounddef)
-        compound.compoundname = xmlutil.findText(xmlCompounddef, "compoundname")
-        for sectiondef in xmlCompounddef.iter("sectiondef"):
-            if sectiondef.get("kind") not in XMLParser.__kindsOfSectionVisibleToWorld:
-                continue
-            for memberdef in sectiondef.iter("memberdef"):
-                member = None
-                kind = memberdef.get("kind")
-                if kind == "variable":
-                    member = Variable()
-                    XMLParser._extractVariableInfo(member, memberdef)
-                elif kind == "function":
-                    member = Function()
-                    XMLParser._extractFunctionInfo(member, memberdef)
-                elif kind == "enum":
-                    member = Enum()
-                    XMLParser._extractEnumInfo(member, memberdef)
-                elif kind == "typedef":
-                    member = TypeDef()
-                    XMLParser._extractTypeDefInfo(member, memberdef)
-
-                if member != None:
-                    member.setParent(compound)
+    def _extractCompoundTypeInfo(compound, record):
+        compound.kind = record.kind
+        compound.name = record.name
+        compound.location = record.location
+        compound.compoundname = record.compoundname
+        for member in record.members:
+            member.setParent(compound)
 
         return True
 
+    @staticmethod
+    def _createMember(memberdef):
+        member = None
+        kind = memberdef.get("kind")
+        if kind == "variable":
+            member = Variable()
+            XMLParser._extractVariableInfo(member, memberdef)
+        elif kind == "function":
+            member = Function()
+            XMLParser._extractFunctionInfo(member, memberdef)
+        elif kind == "enum":
+            member = Enum()
+            XMLParser._extractEnumInfo(member, memberdef)
+        elif kind == "typedef":
+            member = TypeDef()
+            XMLParser._extractTypeDefInfo(member, memberdef)
+        return member
+
+    @staticmethod
+    def _readCompound(refid, xmlfilePath):
+        record = CompoundRecord(refid)
+
+        # members are built while streaming, generated headers may produce hundreds of MB of memberdef
+        def onMemberdef(sectiondef, memberdef):
+            if sectiondef.get("kind") not in XMLParser.__kindsOfSectionVisibleToWorld:
+                return
+            member = XMLParser._createMember(memberdef)
+            if member != None:
+                record.members.append(member)
+
+        xmldb = xmlutil.streamXMLDB(xmlfilePath, "memberdef", onMemberdef)
+        if xmldb == None:
+            errorHelp("Error while parsing file " + xmlfilePath)
+        compounddef = xmldb.find("compounddef")
+
+        XMLParser._extractCodeUnitInfo(record, compounddef)
+        record.compoundname = xmlutil.findText(compounddef, "compoundname")
+
+        record.includes = [Header.Include(include.text, xmlutil.getText(include, "local") == "yes")
+                           for include in compounddef.iter("includes")]
+        record.innernamespaces = [innernamespace.get("refid") for innernamespace in compounddef.iter("innernamespace")]
+        record.innerclasses = [innerclass.get("refid") for innerclass in compounddef.iter("innerclass")]
+        record.inheritInfo = [
+            Class.InheritInfo(
+                xmlutil.getText(basecompoundref, "refid"),
+                basecompoundref.text,
+                xmlutil.getText(basecompoundref, "prot"),
+                xmlutil.getText(basecompoundref, "virt") == "virtual") for basecompoundref in compounddef.iter("basecompoundref")
+        ]
+        return record
+
     def _extractClassInfo(self, cls):
         assert (isinstance(cls, Class))
         if cls.dataAvailable: return True
 
-        compounddef = self._findCompounddef(cls.refid)
-        if compounddef == None: return False
+        record = self._findCompound(cls.refid)
+        if record == None: return False
 
-        XMLParser._extractCompoundTypeInfo(cls, compounddef)
+        XMLParser._extractCompoundTypeInfo(cls, record)
         if cls.compoundname != "":
-            inheritInfo = [
-                Class.InheritInfo(
-                    xmlutil.getText(basecompoundref, "refid"),
-                    basecompoundref.text,
-                    xmlutil.getText(basecompoundref, "prot"),
-                    xmlutil.getText(basecompoundref, "virt") == "virtual") for basecompoundref in compounddef.iter("basecompoundref")
-            ]
-            if len(inheritInfo) > 0: cls.inheritInfo = inheritInfo
+            if len(record.inheritInfo) > 0: cls.inheritInfo = self._linkBases(cls, record.inheritInfo)
 
             lastOfColon = cls.compoundname.rfind(":")
             if lastOfColon == -1:
@@ -160,27 +322,47 @@ class XMLParser(DataParser):
             else:
                 cls.name = cls.compoundname[lastOfColon + 1:]
 
-                for innerclass in compounddef.iter("innerclass"):
-                    self.project.addClass(innerclass.get("refid")).setParent(cls)
+                for innerclassRefid in record.innerclasses:
+                    self._addClass(innerclassRefid).setParent(cls)
                 for innerclass in cls.innerclasses:
-                    self._makeCompoundDataAvailable(innerclass, XMLParser._extractClassInfo)
+                    if not self.lazy:
+                        self._makeCompoundDataAvailable(innerclass, XMLParser._extractClassInfo)
 
                 return True
         else:
             return False
 
+    def _linkBases(self, cls, inheritInfo):
+        '''
+        Link the bases doxygen gave no refid: a doxygen run on a shard does not know the classes of the other
+        shards, they are found by name in the indexes of all the shards
+        '''
+        for ii in inheritInfo:
+            if ii.baseref not in self._compoundDirs:
+                refid = lookupScopedName(self._classRefids, cls.compoundname, ii.basename or "")
+                if refid != None:
+                    ii.baseref = refid
+        return inheritInfo
+
     def _extractNamespaceInfo(self, namespace):
         assert (isinstance(namespace, Namespace))
         if namespace.dataAvailable: return True
-        compounddef = self._findCompounddef(namespace.refid)
-        if compounddef == None:return False
-
-        XMLParser._extractCompoundTypeInfo(namespace, compounddef)
-
-        for innerclassDB in compounddef.iter("innerclass"):
-            cls = self.project.addClass(innerclassDB.get("refid"))
+        record = self._findCompound(namespace.refid)
+        if record == None:return False
+
+        XMLParser._extractCompoundTypeInfo(namespace, record)
+        innerclassRefids = list(record.innerclasses)
+        for xmlDir in self._compoundDirs.get(namespace.refid, [])[1:]:
+            shardRecord = self._findCompound(namespace.refid, xmlDir)
+            for member in shardRecord.members:
+                member.setParent(namespace)
+            innerclassRefids += [refid for refid in shardRecord.innerclasses if refid not in innerclassRefids]
+
+        for innerclassRefid in innerclassRefids:
+            cls = self._addClass(innerclassRefid)
             cls.setParent(namespace)
-            self._makeCompoundDataAvailable(cls, XMLParser._extractClassInfo)
+            if not self.lazy:
+                self._makeCompoundDataAvailable(cls, XMLParser._extractClassInfo)
 
         return True
 
@@ -189,27 +371,41 @@ class XMLParser(DataParser):
         assert (isinstance(header, Header))
         if header.dataAvailable: return True
 
-        compounddef = self._findCompounddef(header.refid)
-        if compounddef == None: return False
+        record = self._findCompound(header.refid)
+        if record == None: return False
 
-        XMLParser._extractCompoundTypeInfo(header, compounddef)
+        XMLParser._extractCompoundTypeInfo(header, record)
         header.updateName()
-        for include in compounddef.iter("includes"):
-            header.includes.append(Header.Include(include.text, xmlutil.getText(include, "local") == "yes"))
+        header.includes += record.includes
 
-        for innernamespaceDB in compounddef.iter("innernamespace"):
-            header.namespaces.append(self.project.addNamespace(innernamespaceDB.get("refid")))
-        for innerclassDB in compounddef.iter("innerclass"):
-            header.innerclasses.append(self.project.addClass(innerclassDB.get("refid")))
+        for innernamespaceRefid in record.innernamespaces:
+            header.namespaces.append(self._addNamespace(innernamespaceRefid))
+        for innerclassRefid in record.innerclasses:
+            cls = self._addClass(innerclassRefid)
+            if isinstance(cls, LazyCompound) and not cls.isLoaded():
+                # known without loading the class: the namespaces find their units of a header by location
+                cls.location = CodeUnit.Location(header.location.file)
+            header.innerclasses.append(cls)
 
         return True
 
-    def _findCompounddef(self, refid):
-        xmlfilePath = os.path.join(self.workingDir, refid + ".xml")
-        if not os.path.isfile(xmlfilePath):
+    def _compoundPath(self, refid, xmlDir = None):
+        if xmlDir == None:
+            xmlDirs = self._compoundDirs.get(refid)
+            if xmlDirs == None: # not listed in any index.xml
+                xmlDirs = [d for d in self.xmlDirs if self.store.exists(os.path.join(d, refid + ".xml"))] or self.xmlDirs
+            xmlDir = xmlDirs[0]
+        return os.path.join(xmlDir, refid + ".xml")
+
+    def _findCompound(self, refid, xmlDir = None):
+        xmlfilePath = self._compoundPath(refid, xmlDir)
+        # a prefetched record is handed out once, the further lookups go to the store
+        record = self._prefetched.pop(xmlfilePath, None)
+        if record != None:
+            self.store.put(xmlfilePath, record)
+            return record
+
+        if not self.store.exists(xmlfilePath):
             errorHelp("{0} does not exist, error maybe due to doxygen works incorrectly".format(xmlfilePath))
-        xmldb = xmlutil.createXMLDB(xmlfilePath)
-        if xmldb == None:
-            errorHelp("Error while parsing file " + xmlfilePath)
 
-        return xmldb.find("compounddef")
+        return self.store.get(refid, xmlfilePath)
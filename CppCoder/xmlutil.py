@@ -1,6 +1,12 @@
+import sys
 import xml.etree.ElementTree as ET
 from environ import errorHelp
 
+try:
+    _intern = sys.intern
+except AttributeError:
+    _intern = intern # python 2
+
 def createXMLDB(path):
     xmltree = ET.parse(path)
     if xmltree != None:
@@ -8,6 +14,27 @@ def createXMLDB(path):
     else:
         return None
 
+def streamXMLDB(path, tag, onElement):
+    '''
+    Parse the file incrementally, onElement(parent, elem) is called as soon as each <tag> element is closed,
+    the element is then dropped from its parent, so the memory does not grow with the number of <tag> elements.
+    Return the root element, which holds everything else of the file
+    '''
+    root = None
+    parents = []
+    for event, elem in ET.iterparse(path, events=("start", "end")):
+        if event == "start":
+            if root == None: root = elem
+            parents.append(elem)
+            continue
+
+        parents.pop()
+        if elem.tag == tag and len(parents) > 0:
+            onElement(parents[-1], elem)
+            elem.clear()
+            parents[-1].remove(elem)
+    return root
+
 def findText(elem, tag):
     return elem.findtext(tag, "")
 
@@ -22,4 +49,10 @@ def findTagProp(elem, tagName, propName):
         return ""
 
 def joinTextOfEntireChildren(elem, delim=""):
-    return delim.join(elem.itertext())
\ No newline at end of file
+    return delim.join(elem.itertext())
+
+def internText(text):
+    '''Share the strings repeated all over the model: types, file paths, scopes, kinds'''
+    if text == None:
+        return text
+    return _intern(text)
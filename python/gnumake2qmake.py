@@ -8,8 +8,19 @@ import sys
 import re
 import argparse
 import StringIO
+import json
+import hashlib
+import multiprocessing
+import multiprocessing.pool
 import xml.etree.ElementTree as ET
 from collections import OrderedDict
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir # backport of os.scandir for python 2
+    except ImportError:
+        scandir = None
 
 # Qmake constants
 QMAKE_FILE_TEMPLATE_APP = 'TEMPLATE = app\nCONFIG += console \nCONFIG -= app_bundle \nCONFIG -= qt\n\n\n'
@@ -35,6 +46,29 @@ class FSUtill:
         else:
             return dir[idx + 1:].strip()
 
+    @staticmethod
+    def listDir(dir):
+        '''
+        List dir once: return (files, subdirs) as paths in the listing order. scandir tells the directories apart with the
+        type of the entries, instead of a stat of each one by os.path.isdir
+        '''
+        files = []
+        subdirs = []
+        if scandir != None:
+            for entry in scandir(dir):
+                if entry.is_dir():
+                    subdirs.append(entry.path)
+                else:
+                    files.append(entry.path)
+        else:
+            for file in os.listdir(dir):
+                absFile = os.path.join(dir, file)
+                if os.path.isdir(absFile):
+                    subdirs.append(absFile)
+                else:
+                    files.append(absFile)
+        return files, subdirs
+
     @staticmethod
     def getFilesByType(dir, type):
         fileList = os.listdir(dir)
@@ -83,11 +117,22 @@ class ContenWriter:
 
     @staticmethod
     def write(dir, name, content):
+        ContenWriter.__device().write(dir, name, content)
+
+    @staticmethod
+    def remove(dir, name):
+        ContenWriter.__device().remove(dir, name)
+
+    @staticmethod
+    def summary():
+        return ContenWriter.__device().summary()
+
+    @staticmethod
+    def __device():
         if ContenWriter.__impl == None:
             Logger.info("Warning: output direction is not specified, then write to file")
-            ContenWriter.__impl = ContenWriter.__FileWriter
-        ContenWriter.__impl.write(dir, name, content)
-
+            ContenWriter.__impl = ContenWriter.__FileWriter()
+        return ContenWriter.__impl
 
     class __ConsoleWriter:
         def write(self, dir, name, content):
@@ -96,25 +141,186 @@ class ContenWriter:
             Logger.verbose(content)
             Logger.verbose("END: ===============" + name + ".pro=================")
 
+        def remove(self, dir, name):
+            pass
+
+        def summary(self):
+            return ""
+
     class __FileWriter:
+        '''
+        Write a file only when its content changes, so qt-creator does not reload the projects which stay the same.
+        The content is written to a temporary file renamed over the old one, then the file is never seen half written
+        '''
+        def __init__(self):
+            self.written = 0
+            self.unchanged = 0
+            self.removed = 0
+
         def write(self, dir, name, content):
             if not os.path.exists(dir):
                 os.makedirs(dir)
             filepath = os.path.join(dir, name)
-            f = open(filepath, 'w')
+            if self.__hasContent(filepath, content):
+                self.unchanged += 1
+                Logger.verbose(filepath + " is unchanged")
+                return
+            tmppath = filepath + ".tmp"
+            f = open(tmppath, 'w')
             f.write(content)
             f.close()
+            if os.name == "nt" and os.path.exists(filepath):
+                os.remove(filepath) # rename does not replace an existing file on windows
+            os.rename(tmppath, filepath)
+            self.written += 1
             Logger.verbose("write to " + filepath + " finished")
 
+        def remove(self, dir, name):
+            filepath = os.path.join(dir, name)
+            if os.path.exists(filepath):
+                os.remove(filepath)
+                self.removed += 1
+                Logger.info("--> Removed: " + filepath)
+
+        def summary(self):
+            return "Files: {0} written, {1} unchanged, {2} removed".format(self.written, self.unchanged, self.removed)
+
+        def __hasContent(self, filepath, content):
+            if not os.path.isfile(filepath):
+                return False
+            f = open(filepath, 'r')
+            oldContent = f.read()
+            f.close()
+            return oldContent == content
+
+class Manifest:
+    '''
+    Record of the last generation stored in the output directory: for each node the mtime, size and sha1 of its
+    .srclist/.gnumake inputs and of the emitted .pro. With --incremental the nodes whose inputs and .pro are unchanged
+    are neither parsed nor written again, and the .pro of the nodes which are not generated anymore are removed
+    '''
+    FILE_NAME = ".gnumake2qmake.json"
+    VERSION = 1
+    INPUT_TYPES = (".srclist", ".gnumake")
+
+    def __init__(self, args):
+        self.__enabled = args.outDevice == ContenWriter.FILE_DEVICE
+        self.__incremental = args.incremental
+        self.__outdir = os.path.abspath(args.outdir)
+        self.__path = os.path.join(self.__outdir, Manifest.FILE_NAME)
+        self.__settings = {"gnumakepath": os.path.abspath(args.gnumakepath), "variant": args.variant, "mode": args.mode}
+        self.__previous = {} # node dir --> { "inputs": { path: state }, "pro": path in outdir, "proState": state, "project": name }
+        self.__current = {} # node dir --> entry of this generation
+        self.__trusted = False # the previous entries are reused only when they were generated with the same settings
+
+    def load(self):
+        if not self.__enabled or not os.path.exists(self.__path):
+            return
+        try:
+            f = open(self.__path, 'r')
+            data = json.load(f)
+            f.close()
+        except (IOError, ValueError):
+            Logger.info("Warning: " + self.__path + " is unreadable, then all projects are generated")
+            return
+        if data.get("version") != Manifest.VERSION:
+            return
+        self.__previous = data["nodes"]
+        self.__trusted = self.__incremental and data["settings"] == self.__settings
+        if self.__incremental and not self.__trusted:
+            Logger.info("Warning: last generation was made with other arguments, then all projects are generated")
+
+    def save(self):
+        if not self.__enabled or not os.path.isdir(self.__outdir):
+            return
+        f = open(self.__path, 'w')
+        json.dump({"version": Manifest.VERSION, "settings": self.__settings, "nodes": self.__current}, f, sort_keys=True)
+        f.close()
+
+    def inputStates(self, node):
+        '''State of each input file of node, the sha1 of the last generation is reused as long as mtime and size are the same'''
+        states = {}
+        if self.__enabled:
+            recorded = self.__previous.get(node.dir, {}).get("inputs", {})
+            for type in Manifest.INPUT_TYPES:
+                for path in FSUtill.getFilesByType(node.dir, type):
+                    states[path] = Manifest.__stateOf(path, recorded.get(path))
+        return states
+
+    def upToDate(self, node):
+        '''node is up to date when its inputs have the same content as in the last generation and its .pro was not touched'''
+        if not self.__trusted or node.dir not in self.__previous:
+            return False
+        entry = self.__previous[node.dir]
+        if Manifest.__hashes(entry["inputs"]) != Manifest.__hashes(node.inputStates):
+            return False
+        if entry["pro"] != None:
+            proPath = os.path.join(self.__outdir, entry["pro"])
+            if not os.path.exists(proPath) or Manifest.__stateOf(proPath, entry["proState"])[2] != entry["proState"][2]:
+                return False
+        return True
+
+    def keep(self, node):
+        '''Carry the entry of the up to date node over to this generation, return the name of its project'''
+        entry = self.__previous[node.dir]
+        entry["inputs"] = node.inputStates
+        self.__current[node.dir] = entry
+        return entry["project"]
+
+    def record(self, node, project, content, inputStates = None):
+        '''Record the .pro generated for node, project is empty when node has no .pro'''
+        if not self.__enabled:
+            return
+        entry = {"inputs": inputStates or {}, "pro": None, "proState": None, "project": project}
+        if project != "":
+            proPath = os.path.join(node.outdir, project + ".pro")
+            entry["pro"] = os.path.relpath(os.path.abspath(proPath), self.__outdir)
+            entry["proState"] = Manifest.__stateOf(proPath, None, hashlib.sha1(content).hexdigest())
+        self.__current[node.dir] = entry
+
+    def prune(self):
+        '''Remove the .pro of the last generation which are not generated anymore, and their directories left empty'''
+        if not self.__enabled:
+            return
+        for dir, entry in self.__previous.items():
+            current = self.__current.get(dir)
+            if entry["pro"] == None or (current != None and current["pro"] == entry["pro"]):
+                continue
+            proPath = os.path.join(self.__outdir, entry["pro"])
+            ContenWriter.remove(os.path.dirname(proPath), os.path.basename(proPath))
+            outdir = os.path.dirname(proPath)
+            while outdir.startswith(self.__outdir + os.sep) and os.path.isdir(outdir) and len(os.listdir(outdir)) == 0:
+                os.rmdir(outdir)
+                outdir = os.path.dirname(outdir)
+
+    @staticmethod
+    def __stateOf(path, recorded, sha1 = None):
+        '''[mtime, size, sha1] of path, sha1 is taken from recorded when mtime and size did not change'''
+        stat = os.stat(path)
+        if sha1 == None:
+            if recorded != None and recorded[0] == stat.st_mtime and recorded[1] == stat.st_size:
+                sha1 = recorded[2]
+            else:
+                f = open(path, 'rb')
+                sha1 = hashlib.sha1(f.read()).hexdigest()
+                f.close()
+        return [stat.st_mtime, stat.st_size, sha1]
+
+    @staticmethod
+    def __hashes(states):
+        return dict((path, state[2]) for path, state in states.items())
+
 class GnumakeProjectChooser:
     def __init__(self):
         self.__variantList = [ 'inf4cv', 'aivi', 'rnaivi', 'rnaivi2', 'aivi_tts', 'rivie']
         self._selectedBuildMode = self.__toGnumakeMode(Project.Instance().args.mode)
 
-    # buildable when dir contains gnumake file
-    def buildable(self, dir):
+    # buildable when dir contains gnumake file, files: the files of dir when they are already listed
+    def buildable(self, dir, files = None):
         self.__complainNullProject()
-        if len(FSUtill.getFilesByType(dir, ".gnumake")) > 0:
+        if files == None:
+            files = FSUtill.getFilesByType(dir, ".gnumake")
+        if len([file for file in files if file.endswith(".gnumake")]) > 0:
             return True;
         else:
             Logger.verbose("--> Not a buildable directory: " + dir)
@@ -197,6 +403,8 @@ class ProjectArguments:
         self.verbose = False
         self.outDevice = ContenWriter.FILE_DEVICE
         self.debugscript = False
+        self.jobs = 1
+        self.incremental = False
         if os.name != "nt":
             self.parseArgs()
 
@@ -216,6 +424,8 @@ class ProjectArguments:
         argParser.add_argument('-m', "--mode", default='release', help='release | debug')
         argParser.add_argument('-d', "--outdevice", default='file', help='write output to file or console, default is write to file. i.e: -o console|file')
         argParser.add_argument('-b', "--debug", help='print parsed tree structure, using this option only for debugging the script', action='store_true')
+        argParser.add_argument('-j', "--jobs", default=1, type=int, help='number of threads listing the directories of the gnumake tree and of processes parsing the gnumake files')
+        argParser.add_argument('-i', "--incremental", help='only parse and write again the projects whose gnumake/srclist files changed since the last generation into outdir', action='store_true')
         args = argParser.parse_args()
         self.gnumakepath = args.gnumakepath
         self.outdir = args.outdir
@@ -224,6 +434,8 @@ class ProjectArguments:
         self.__setOutDevice(args.outdevice)
         self.debugscript = args.debug
         self.mode = args.mode
+        self.jobs = max(1, args.jobs)
+        self.incremental = args.incremental
 
     def reformShellCommand(self):
         vbReplacement = ""
@@ -238,9 +450,9 @@ class ProjectArguments:
         else:
             odReplacement = "console"
 
-        return 'python {0} -o {1} -t {2} -m {3} -d {4} {5} {6} {7}'. \
+        return 'python {0} -o {1} -t {2} -m {3} -d {4} -j {5} -i {6} {7} {8}'. \
             format(os.path.abspath(sys.argv[0]), os.path.abspath(self.outdir), self.variant, self.mode,
-                   odReplacement, os.path.abspath(self.gnumakepath),
+                   odReplacement, self.jobs, os.path.abspath(self.gnumakepath),
                    dbReplacement, vbReplacement)
 
 class Project:
@@ -264,6 +476,7 @@ class Project:
         Project.__instance.chooser = ProjectChooserFactory.create(srcType)
         Project.__instance.generator = CodeGenerator.create(destType)
         Project.__instance.parser = ParserFactory.create(srcType)
+        Project.__instance.manifest = Manifest(Project.__instance.args)
         return Project.__instance
 
     def __init__(self):
@@ -278,33 +491,62 @@ class Project:
         if self.args.debugscript == True:
             treeNode.dumpTreeData()
         else:
+            self.manifest.load()
             self.parser.setNode(treeNode).parse()
             projectName = self.generator.setNode(treeNode).genTarget() # projectName will be the root project in case of multiple sub-projects
+            self.manifest.prune()
+            self.manifest.save()
             if projectName.strip() != "":
                 self.__generateUtilsScripts()
                 Logger.info("Root Project " + projectName + " has been created!")
             else:
                 Logger.info("This directory does not contain any things match with the input arguments")
                 Logger.info("Nothing to do with: " + self.args.gnumakepath)
-
-    def __formPrjTree(self, currentWorkingDir, parentNode=None):
+            if ContenWriter.summary() != "":
+                Logger.info(ContenWriter.summary())
+
+    def __formPrjTree(self, rootDir):
+        '''
+        Discover the tree level by level, the directories of a level are listed concurrently by args.jobs threads.
+        The buildable directories are not descended, then the DirNode/BuildNode tree is formed from the listings
+        '''
+        listings = {} # dir --> (buildable, subdirs)
+        level = [rootDir]
+        pool = multiprocessing.pool.ThreadPool(self.args.jobs) if self.args.jobs > 1 else None
+        try:
+            while len(level) > 0:
+                if pool != None:
+                    results = pool.map(self.__discoverDir, level)
+                else:
+                    results = [self.__discoverDir(dir) for dir in level]
+                nextLevel = []
+                for dir, (buildable, subdirs) in zip(level, results):
+                    listings[dir] = (buildable, subdirs)
+                    nextLevel.extend(subdirs)
+                level = nextLevel
+        finally:
+            if pool != None:
+                pool.close()
+                pool.join()
+        return self.__formNode(rootDir, listings)
+
+    def __discoverDir(self, dir):
+        files, subdirs = FSUtill.listDir(dir)
+        if self.chooser.buildable(dir, files):
+            return True, []
+        return False, subdirs
+
+    def __formNode(self, currentWorkingDir, listings, parentNode=None):
         treeNode = None
-        if self.chooser.buildable(currentWorkingDir):
+        buildable, subdirs = listings[currentWorkingDir]
+        if buildable:
             treeNode = BuildNode(currentWorkingDir, parentNode)
-        else:
-            filesInPath = os.listdir(currentWorkingDir)
-            if len(filesInPath) > 0:
-                subdirs = []
-                for file in filesInPath:
-                    absFile = os.path.join(currentWorkingDir, file)
-                    if os.path.isdir(absFile):
-                        subdirs.append(absFile)
-                if len(subdirs) > 0:
-                    treeNode = DirNode(currentWorkingDir, parentNode)
-                    for subdir in subdirs:
-                        subTree = self.__formPrjTree(subdir, treeNode)
-                        if subTree != None and subTree.usable():
-                            treeNode.addChild(subTree)
+        elif len(subdirs) > 0:
+            treeNode = DirNode(currentWorkingDir, parentNode)
+            for subdir in subdirs:
+                subTree = self.__formNode(subdir, listings, treeNode)
+                if subTree != None and subTree.usable():
+                    treeNode.addChild(subTree)
         return treeNode
 
     def __generateUtilsScripts(self):
@@ -380,6 +622,9 @@ class DirNode:
         return self.hasChild()
 
 class BuildNode(DirNode):
+    # the fields set by the parser, only from the files of the node
+    PARSED_FIELDS = ("includePaths", "defines", "cflags", "cxxflags", "cppFiles", "cc", "cxx", "dbger")
+
     def __init__(self, dir=".", parentNode=None):
         DirNode.__init__(self, dir, parentNode)
         self.includePaths = ""
@@ -391,10 +636,20 @@ class BuildNode(DirNode):
         self.cxx = ""
         self.dbger = ""
         self.parsed = False
+        self.inputStates = {} # path of .srclist/.gnumake --> state recorded in the manifest
+        self.upToDate = False # generated by the last run from the same inputs, so neither parsed nor written again
 
     def usable(self):
         return True
 
+    def parsedFields(self):
+        return tuple(getattr(self, field) for field in BuildNode.PARSED_FIELDS)
+
+    def setParsedFields(self, values):
+        for field, value in zip(BuildNode.PARSED_FIELDS, values):
+            setattr(self, field, value)
+        self.parsed = True
+
 class QmakeGenerator(CodeGenerator):
     def __init__(self):
         self.__rootNode = None
@@ -452,7 +707,9 @@ class QmakeGenerator(CodeGenerator):
                         childPrjList.append(childNode)
                 if len(childPrjList) > 0:
                     prjName = self.__node.getNodeName()
-                    ContenWriter.write(self.__node.outdir, prjName + ".pro", self.createQmakeContent(childPrjList))
+                    content = self.createQmakeContent(childPrjList)
+                    ContenWriter.write(self.__node.outdir, prjName + ".pro", content)
+                    Project.Instance().manifest.record(self.__node, prjName, content)
 
             self.__node.verbose("Parsing done: " + self.__node.getNodeName() + " <--- ")
             if prjName != "":
@@ -480,6 +737,9 @@ class QmakeGenerator(CodeGenerator):
             if not Project.Instance().chooser.choose(self.__node.dir):
                 self.__node.verbose("don't parse " + self.__node.dir)
                 prjName = ""
+            elif self.__node.upToDate:
+                self.__node.verbose("up to date: " + self.__node.dir)
+                prjName = Project.Instance().manifest.keep(self.__node)
             else:
                 self.__node.verbose("START: Parsing gnumake file...")
                 qmakeContent = self.createQmakeContent()
@@ -488,6 +748,7 @@ class QmakeGenerator(CodeGenerator):
                     ContenWriter.write(self.__node.outdir, prjName + ".pro", qmakeContent)
                 else:
                     self.__node.info(self.__node.getNodeName() + " ----> EMPTY!!!")
+                Project.Instance().manifest.record(self.__node, prjName, qmakeContent, self.__node.inputStates)
 
             self.__node.verbose("PARSING DONE: " + self.__node.getNodeName())
             if prjName != "": self.__node.info(" --> Created sub project: " + prjName)
@@ -514,6 +775,13 @@ class QmakeGenerator(CodeGenerator):
             else:
                 return ""
 
+_parsingNodes = None
+
+def _parseNodeInProcess(index):
+    node = _parsingNodes[index]
+    GnumakeParser.parseNode(node)
+    return node.parsedFields()
+
 class GnumakeParser:
     def __init__(self):
         self.__rootNode = None
@@ -523,7 +791,56 @@ class GnumakeParser:
         return self
 
     def parse(self):
-        GnumakeParser.parseNode(self.__rootNode)
+        '''
+        Parse the BuildNodes chosen by the variant and mode, the others are never generated, nor are the nodes the manifest
+        finds up to date. Each node only reads its own files, so with args.jobs > 1 they are parsed by a pool of processes
+        '''
+        chooser = Project.Instance().chooser
+        manifest = Project.Instance().manifest
+        buildNodes = []
+        chosenCount = 0
+        for node in GnumakeParser.collectBuildNodes(self.__rootNode):
+            if not chooser.choose(node.dir):
+                continue
+            chosenCount += 1
+            node.inputStates = manifest.inputStates(node)
+            node.upToDate = manifest.upToDate(node)
+            if node.upToDate:
+                node.parsed = True
+            else:
+                buildNodes.append(node)
+        if len(buildNodes) < chosenCount:
+            Logger.info("{0} of {1} projects are up to date, parsing the {2} others".format(chosenCount - len(buildNodes), chosenCount, len(buildNodes)))
+        jobs = Project.Instance().args.jobs
+        if jobs > 1 and len(buildNodes) > 1:
+            GnumakeParser.__parseConcurrently(buildNodes, jobs)
+        else:
+            for node in buildNodes:
+                GnumakeParser.parseNode(node)
+
+    @staticmethod
+    def collectBuildNodes(node):
+        if isinstance(node, BuildNode):
+            return [node]
+        buildNodes = []
+        if isinstance(node, DirNode):
+            for childNode in node.childList:
+                buildNodes.extend(GnumakeParser.collectBuildNodes(childNode))
+        return buildNodes
+
+    @staticmethod
+    def __parseConcurrently(buildNodes, jobs):
+        global _parsingNodes
+        _parsingNodes = buildNodes # inherited by the forked processes, only the parsed fields are sent back
+        pool = multiprocessing.Pool(jobs)
+        try:
+            parsedFieldsList = pool.map(_parseNodeInProcess, range(len(buildNodes)))
+        finally:
+            pool.close()
+            pool.join()
+            _parsingNodes = None
+        for node, parsedFields in zip(buildNodes, parsedFieldsList):
+            node.setParsedFields(parsedFields)
 
     @staticmethod
     def parseNode(node):
@@ -581,23 +898,63 @@ class GnumakeParser:
         lines = f.readlines();
         f.close()
 
-        # Get include paths
-        node.includePaths = GnumakeParser.__getMatchedLine(r'^CPP_INCLUDES_.*:=', lines).replace("-I", " \\\n")
-        # Get macros defines
-        node.defines = GnumakeParser.__getMatchedLine(r'^CC_DEFINES.*:=', lines).replace("-D", " \\\n")
-        # Get cflags
-        node.cflags = GnumakeParser.__getMatchedLine(r'^C_OPTIONS_.*:=', lines)
-        # Get cxxflags
-        node.cxxflags = GnumakeParser.__getMatchedLine(r'^CPP_OPTIONS_.*:=', lines)
-        # Get c compiler path
-        node.cc = GnumakeParser.__getLastWord(GnumakeParser.__getMatchedLine(r'CC:=', lines))
-        # Get c++ compiler path
-        node.cxx = GnumakeParser.__getLastWord(GnumakeParser.__getMatchedLine(r'CPP:=', lines))
-        # Get debugger path
-        node.dbger = GnumakeParser.__getLastWord(GnumakeParser.__getMatchedLine(r'GDB:=', lines))
+        # One sweep over the logical lines: the first variable met of each field is taken,
+        # a later := of that variable replaces its value and a += appends to it, like make does
+        variables = {} # field --> variable name
+        values = dict((field, "") for field in GnumakeParser.__FIELD_OF_VARIABLE.values())
+        for line in GnumakeParser.__logicalLines(lines):
+            match = GnumakeParser.__VARIABLE_PATTERN.search(line)
+            if match == None:
+                continue
+            field = GnumakeParser.__FIELD_OF_VARIABLE[match.group("family") or match.group("tool")]
+            name = match.group("name") or match.group("tool")
+            variable = variables.get(field)
+            if variable == None:
+                variables[field] = name
+                values[field] = line[match.end():]
+            elif variable == name:
+                if match.group("op") == "+=":
+                    values[field] = values[field].rstrip("\n") + line[match.end():]
+                else:
+                    values[field] = line[match.end():]
+
+        node.includePaths = values["includePaths"].replace("-I", " \\\n")
+        node.defines = values["defines"].replace("-D", " \\\n")
+        node.cflags = values["cflags"]
+        node.cxxflags = values["cxxflags"]
+        node.cc = GnumakeParser.__getLastWord(values["cc"])
+        node.cxx = GnumakeParser.__getLastWord(values["cxx"])
+        node.dbger = GnumakeParser.__getLastWord(values["dbger"])
 
         node.verbose("PARSING DONE: " + gnumakeFile)
 
+    # the variables the .pro is made of, the families match any variable starting with them, the tools match anywhere in a line
+    __VARIABLE_PATTERN = re.compile(r"^(?P<name>(?P<family>CPP_INCLUDES_|CC_DEFINES|C_OPTIONS_|CPP_OPTIONS_)\S*?)\s*(?P<op>:=|\+=)"
+                                    r"|(?P<tool>CC|CPP|GDB):=")
+    __FIELD_OF_VARIABLE = {
+        "CPP_INCLUDES_": "includePaths",
+        "CC_DEFINES": "defines",
+        "C_OPTIONS_": "cflags",
+        "CPP_OPTIONS_": "cxxflags",
+        "CC": "cc",
+        "CPP": "cxx",
+        "GDB": "dbger",
+    }
+
+    @staticmethod
+    def __logicalLines(lines):
+        '''Join the lines continued by a backslash, the backslash-newline and the indentation after it become one space'''
+        continued = ""
+        for line in lines:
+            if line.endswith("\\\n"):
+                continued += line[:-2].rstrip() + " " if continued == "" else line[:-2].strip() + " "
+                continue
+            if continued != "":
+                line = continued + line.lstrip()
+                continued = ""
+            yield line
+        if continued != "":
+            yield continued
 
     @staticmethod
     def __getLastWord(line):
@@ -611,13 +968,6 @@ class GnumakeParser:
                 i -= 1
         return ""
 
-    @staticmethod
-    def __getMatchedLine( searchPattern, lines):
-        for line in lines:
-            if re.search(searchPattern, line):
-                return re.sub(searchPattern, "", line)
-        return ""
-
 # PROGRAM START
 def program_start():
     Project.Init().genTarget()